@@ -1,6 +1,7 @@
-from math import log, inf
+from math import inf
 from typing import List
 import csv
+import numpy as np
 
 
 
@@ -35,20 +36,20 @@ class Node:
 
 
 class Leaf:
-    def __init__(self, data, targets):
-        self.data = data
-        self.targets = targets
+    def __init__(self, counts):
+        self.counts = counts
+        self.size = sum(counts.values())
 
     def categorize(self, row):
-        return valCounts(self.targets)
+        return dict(self.counts)
     
     def __repr__(self):
-        return f"leaf with {len(self.data)} entries"
+        return f"leaf with {self.size} entries"
 
 
 def countPrintTree(node):
     if isinstance(node, Leaf):
-        l = len(node.data)
+        l = node.size
         print(f"leaf with {l} entries")
         return l
     else:
@@ -58,69 +59,161 @@ def countPrintTree(node):
         return l1 + l2
 
 
+def isNumeric(val):
+    return isinstance(val, int) or isinstance(val, float)
+
+
+class Columns:
+    """
+        A table, encoded once into integer-coded numpy columns.
+        Categorical columns are coded in order of first appearance, numeric columns by rank,
+        so that `row[key] >= val` becomes `code >= rank of val`.
+        Targets are coded the same way, in order of first appearance.
+    """
+    def __init__(self, rows, targets):
+        self.keys = list(rows[0].keys())
+        self.values = []
+        self.numeric = []
+        self.codes = []
+        for key in self.keys:
+            colVals = [row[key] for row in rows]
+            numeric = all(isNumeric(val) for val in colVals)
+            if numeric:
+                values = np.unique(np.array(colVals, dtype=float))
+                codes = np.searchsorted(values, np.array(colVals, dtype=float))
+            else:
+                values, codes = encode(colVals)
+            self.values.append(values)
+            self.numeric.append(numeric)
+            self.codes.append(codes)
+        self.classes, self.targets = encode(targets)
+
+    def candidates(self, splitPoints: List[KVPair]):
+        """ for every split point: (column, code). Rows with `code[column] != code` (or `>=` if numeric) go to branch1 """
+        columnOf = {key: i for i, key in enumerate(self.keys)}
+        codeOf = [
+            None if numeric else {val: code for code, val in enumerate(values)}
+            for values, numeric in zip(self.values, self.numeric)
+        ]
+        out = []
+        for point in splitPoints:
+            c = columnOf[point.key]
+            if self.numeric[c]:
+                code = int(np.searchsorted(self.values[c], point.val))
+            else:
+                code = codeOf[c].get(point.val, -1)
+            out.append((c, code))
+        return out
+
+
+def encode(data):
+    """ integer codes for `data`; returns (values in order of first appearance, codes) """
+    codeOf = {}
+    codes = np.empty(len(data), dtype=np.int64)
+    for i, val in enumerate(data):
+        code = codeOf.get(val)
+        if code is None:
+            code = codeOf[val] = len(codeOf)
+        codes[i] = code
+    return list(codeOf.keys()), codes
+
+
 def doCreateTree(splitPoints, rows, targets):
-    ent = entropy(rows, targets)
-    return createTree(splitPoints, rows, targets, ent)
-
-
-def createTree(splitPoints: List[KVPair], rows, targets, entropy):
-    if len(rows) == 1 or len(splitPoints) == 0:
-        return Leaf(rows, targets)
-    splitPoint, rows1, rows2, targ1, targ2, ent1, ent2 = split(splitPoints, rows, targets, entropy)
-    if splitPoint is None:
-        return Leaf(rows, targets)
-    # print(f"splitting at {splitPoint}")
-    newSplitPoints = [sp for sp in splitPoints if sp != splitPoint]
-    tree1 = createTree(newSplitPoints, rows1, targ1, ent1)
-    tree2 = createTree(newSplitPoints, rows2, targ2, ent2)
-    return Node(splitPoint, tree1, tree2)
-
-
-def split(splitPoints: List[KVPair], rows, targets, totalEnt):
-    minInfoGain = - inf
-    best = (None, None, None, None, None, None, None)
-    for point in splitPoints:
-        set1, set2, targets1, targets2 = splitRowsAt(rows, targets, point)
-        if len(set1) > 0 and len(set2) > 0:
-            ent1 = entropy(set1, targets1)
-            ent2 = entropy(set2, targets2)
-            q = len(set1)/len(rows)
-            w = 1 - q
-            infoGain = totalEnt - q*ent1 - w*ent2
-            if infoGain > minInfoGain:
-                minInfoGain = infoGain
-                best = (point, set1, set2, targets1, targets2, ent1, ent2)
+    columns = Columns(rows, targets)
+    candidates = columns.candidates(splitPoints)
+    rowNrs = np.arange(len(rows))
+    counts = np.bincount(columns.targets, minlength=len(columns.classes))
+    return createTree(columns, splitPoints, candidates, np.ones(len(splitPoints), dtype=bool), rowNrs, entropy(counts))
+
+
+def createTree(columns: Columns, splitPoints: List[KVPair], candidates, available, rowNrs, ent):
+    """
+        `rowNrs` are the rows that reach this node; `available[i]` tells if `splitPoints[i]` is still unused on this path.
+        Stops on a single row, on a pure node, or when no split point divides the rows.
+    """
+    if len(rowNrs) == 1 or ent == 0 or not available.any():
+        return leafOf(columns, rowNrs)
+    best, ent1, ent2 = split(columns, candidates, available, rowNrs, ent)
+    if best is None:
+        return leafOf(columns, rowNrs)
+    c, code = candidates[best]
+    mask = branchMask(columns, c, code, rowNrs)
+    newAvailable = available.copy()
+    newAvailable[best] = False
+    tree1 = createTree(columns, splitPoints, candidates, newAvailable, rowNrs[mask], ent1)
+    tree2 = createTree(columns, splitPoints, candidates, newAvailable, rowNrs[~mask], ent2)
+    return Node(splitPoints[best], tree1, tree2)
+
+
+def leafOf(columns: Columns, rowNrs):
+    counts = np.bincount(columns.targets[rowNrs], minlength=len(columns.classes))
+    return Leaf({columns.classes[t]: int(n) for t, n in enumerate(counts) if n > 0})
+
+
+def branchMask(columns: Columns, c, code, rowNrs):
+    """ True for the rows that go to branch1 """
+    if columns.numeric[c]:
+        return columns.codes[c][rowNrs] >= code
+    return columns.codes[c][rowNrs] != code
+
+
+def split(columns: Columns, candidates, available, rowNrs, totalEnt):
+    """
+        Finds the split point with the highest information gain.
+        Per column, one histogram of (code, target) over the node's rows gives the target counts
+        of every candidate's branches: a difference for categorical columns, a suffix-sum for numeric ones.
+        Returns (index of the best split point, entropy of branch1, entropy of branch2).
+    """
+    nrClasses = len(columns.classes)
+    targets = columns.targets[rowNrs]
+    total = np.bincount(targets, minlength=nrClasses)
+    n = len(rowNrs)
+
+    byColumn = {}
+    for i in np.flatnonzero(available):
+        c, code = candidates[i]
+        byColumn.setdefault(c, []).append((i, code))
+
+    maxInfoGain = - inf
+    best = (None, None, None)
+    for c, entries in byColumn.items():
+        nrCodes = len(columns.values[c])
+        hist = np.bincount(columns.codes[c][rowNrs] * nrClasses + targets, minlength=nrCodes * nrClasses)
+        hist = hist.reshape(nrCodes, nrClasses)
+        indices = np.array([i for i, _ in entries])
+        codes = np.array([code for _, code in entries])
+        if columns.numeric[c]:
+            # atLeast[k] = counts of all rows with code >= k
+            atLeast = np.vstack([np.cumsum(hist[::-1], axis=0)[::-1], np.zeros((1, nrClasses), dtype=hist.dtype)])
+            counts1 = atLeast[codes]
+        else:
+            inside = np.where((codes >= 0)[:, None], hist[np.maximum(codes, 0)], 0)
+            counts1 = total - inside
+        counts2 = total - counts1
+        n1 = counts1.sum(axis=1)
+        valid = (n1 > 0) & (n1 < n)
+        if not valid.any():
+            continue
+        ent1 = entropy(counts1)
+        ent2 = entropy(counts2)
+        q = n1 / n
+        infoGain = totalEnt - q * ent1 - (1 - q) * ent2
+        infoGain[~valid] = - inf
+        k = np.argmax(infoGain)
+        # ties go to the split point listed first, as in a plain loop over `splitPoints`
+        if infoGain[k] > maxInfoGain or (infoGain[k] == maxInfoGain and indices[k] < best[0]):
+            maxInfoGain = infoGain[k]
+            best = (int(indices[k]), float(ent1[k]), float(ent2[k]))
     return best
 
 
-def splitRowsAt(rows, targets, point):
-    splitFunction = None
-    if isinstance(point.val, int) or isinstance(point.val, float):
-        splitFunction = lambda row: row[point.key] >= point.val
-    else:
-        splitFunction = lambda row: row[point.key] != point.val
-    set1 = []
-    set2 = []
-    targets1 = []
-    targets2 = []
-    for row, target in zip(rows, targets):
-        if splitFunction(row):
-            set1.append(row)
-            targets1.append(target)
-        else:
-            set2.append(row)
-            targets2.append(target)
-    return (set1, set2, targets1, targets2)
-
-
-def entropy(rows, targets):
-    log2 = lambda x: log(x)/log(2)
-    counts = valCounts(targets)
-    entropy = 0.0
-    for value in counts.keys():
-        p = float(counts[value]) / len(rows)
-        entropy = entropy - p * log2(p)
-    return entropy
+def entropy(counts):
+    """ entropy of the target distribution given by `counts`; for a 2d array, one entropy per row """
+    counts = np.asarray(counts, dtype=float)
+    n = counts.sum(axis=-1, keepdims=True)
+    p = np.divide(counts, n, out=np.zeros_like(counts), where=n > 0)
+    logs = np.log2(p, out=np.zeros_like(p), where=p > 0)
+    return -(p * logs).sum(axis=-1)
 
 
 def valCounts(data):
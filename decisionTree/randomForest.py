@@ -1,69 +1,147 @@
-from math import log, inf
-from random import random
+from multiprocessing import shared_memory
+import multiprocessing
+import copy
 import csv
-from decisionTree import unique, KVPair, doCreateTree
-
-
-def randPredArr(count, prob):
-    out = []
-    for i in range(count):
-        if random() < prob:
-            out.append(True)
-        else:
-            out.append(False)
-    return out
-
-
-def draw(arr, doDraw):
-    out = []
-    for i in range(len(arr)):
-        pred = doDraw[i]
-        if pred:
-            out.append(arr[i])
-    return out
-
-def addDicts(d1, d2):
-    keys1 = list(d1.keys())
-    keys2 = list(d2.keys())
-    keys = unique(keys1 + keys2)
-    out = {}
-    for key in keys:
-        out[key] = 0
-        if key in d1:
-            out[key] += d1[key]
-        if key in d2:
-            out[key] += d2[key]
+import numpy as np
+from decisionTree import KVPair, Leaf, Columns, createTree, entropy
+
+
+
+def shareColumns(columns: Columns):
+    """ copies the codes and targets of `columns` into one shared memory block; returns (block, header, shape, dtype) """
+    data = np.vstack(columns.codes + [columns.targets])
+    block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    np.ndarray(data.shape, dtype=data.dtype, buffer=block.buf)[:] = data
+    header = copy.copy(columns)
+    header.codes = None
+    header.targets = None
+    return block, header, data.shape, data.dtype
+
+
+def attachColumns(name, header: Columns, shape, dtype):
+    """ a `Columns` whose codes and targets are read-only views into the shared memory block `name` """
+    block = shared_memory.SharedMemory(name=name)
+    data = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    data.flags.writeable = False
+    columns = copy.copy(header)
+    columns.codes = list(data[:-1])
+    columns.targets = data[-1]
+    return block, columns
+
+
+def trainTree(columns: Columns, splitPoints, candidates, seed):
+    """
+        Trains one tree on a random half of the rows of `columns`.
+        Only split points whose value occurs in that half are used, as if the tree had been trained on the half alone.
+    """
+    rng = np.random.default_rng(seed)
+    rowNrs = np.flatnonzero(rng.random(len(columns.targets)) < 0.5)
+    present = [np.bincount(codes[rowNrs], minlength=len(values)) > 0 for codes, values in zip(columns.codes, columns.values)]
+    available = np.array([present[c][code] for c, code in candidates], dtype=bool)
+    counts = np.bincount(columns.targets[rowNrs], minlength=len(columns.classes))
+    return createTree(columns, splitPoints, candidates, available, rowNrs, entropy(counts))
+
+
+workerState = {}
+
+def initWorker(name, header, shape, dtype, splitPoints, candidates):
+    workerState['block'], workerState['columns'] = attachColumns(name, header, shape, dtype)
+    workerState['splitPoints'] = splitPoints
+    workerState['candidates'] = candidates
+
+def trainTask(seed):
+    return trainTree(workerState['columns'], workerState['splitPoints'], workerState['candidates'], seed)
+
+
+def columnsOf(rows):
+    """ `rows` as {key: numpy column}; `rows` is either a list of dicts or already such a mapping """
+    if isinstance(rows, dict):
+        return {key: np.asarray(col) for key, col in rows.items()}
+    return {key: np.array([row[key] for row in rows]) for key in rows[0].keys()}
+
+
+def addVotes(tree, cols, rowNrs, votes, classIndex):
+    """ pushes the rows `rowNrs` down `tree` as a whole and adds the leaves' counts to `votes` """
+    if len(rowNrs) == 0:
+        return
+    if isinstance(tree, Leaf):
+        for cls, count in tree.counts.items():
+            votes[rowNrs, classIndex[cls]] += count
+        return
+    point = tree.splitPoint
+    col = cols[point.key][rowNrs]
+    if isinstance(point.val, int) or isinstance(point.val, float):
+        mask = col >= point.val
+    else:
+        mask = col != point.val
+    addVotes(tree.branch1, cols, rowNrs[mask], votes, classIndex)
+    addVotes(tree.branch2, cols, rowNrs[~mask], votes, classIndex)
+
+
+def leafClasses(tree, out):
+    if isinstance(tree, Leaf):
+        for cls in tree.counts:
+            if cls not in out:
+                out[cls] = len(out)
+    else:
+        leafClasses(tree.branch1, out)
+        leafClasses(tree.branch2, out)
     return out
 
 
 
 class RandomForest:
-    def __init__(self, nrTrees, trainingRows, trainingTargets):
-        n = len(trainingRows)
-        trees = []
-        for _ in range(nrTrees):
-            indices = randPredArr(n, 0.5)
-            subTrainingRows = draw(trainingRows, indices)
-            subTrainingTargets = draw(trainingTargets, indices)
-
-            splitPoints = []
-            for key in subTrainingRows[0].keys():
-                colVals = [row[key] for row in subTrainingRows]
-                uniqueVals = unique(colVals)
-                splitPoints += [KVPair(key, val) for val in uniqueVals]
-
-            tree = doCreateTree(splitPoints, subTrainingRows, subTrainingTargets)
-            trees.append(tree)
-
-        self.trees = trees
+    """
+        `nrTrees` trees, each trained on a random half of the rows.
+        The rows are encoded once; with `nrWorkers` > 1 the trees are trained in a process pool
+        that reads the encoded table from shared memory.
+    """
+    def __init__(self, nrTrees, trainingRows, trainingTargets, nrWorkers = None, seed = None):
+        columns = Columns(trainingRows, trainingTargets)
+        splitPoints = [
+            KVPair(key, val)
+            for key, values, numeric in zip(columns.keys, columns.values, columns.numeric)
+            for val in (values.tolist() if numeric else values)
+        ]
+        candidates = columns.candidates(splitPoints)
+        seeds = np.random.SeedSequence(seed).spawn(nrTrees)
+
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        nrWorkers = min(nrWorkers or context.cpu_count(), nrTrees)
+        if nrWorkers <= 1:
+            self.trees = [trainTree(columns, splitPoints, candidates, s) for s in seeds]
+        else:
+            block, header, shape, dtype = shareColumns(columns)
+            try:
+                initArgs = (block.name, header, shape, dtype, splitPoints, candidates)
+                with context.Pool(nrWorkers, initializer=initWorker, initargs=initArgs) as pool:
+                    self.trees = pool.map(trainTask, seeds)
+            finally:
+                block.close()
+                block.unlink()
+
+        classIndex = {}
+        for tree in self.trees:
+            leafClasses(tree, classIndex)
+        self.classes = list(classIndex.keys())
+
+    def predict_batch(self, rows):
+        """
+            Votes of all trees for every row of `rows` (a list of dicts or a mapping {key: column}).
+            Returns an array of shape (nrRows, len(self.classes)); column j counts the votes for `self.classes[j]`.
+        """
+        cols = columnsOf(rows)
+        n = len(next(iter(cols.values())))
+        classIndex = {cls: j for j, cls in enumerate(self.classes)}
+        votes = np.zeros((n, len(self.classes)), dtype=np.int64)
+        rowNrs = np.arange(n)
+        for tree in self.trees:
+            addVotes(tree, cols, rowNrs, votes, classIndex)
+        return votes
 
     def predict(self, row):
-        prediction = {}
-        for i, tree in enumerate(self.trees):
-            print(f"... predicting {i} of {len(self.trees)} ...")
-            treeClassification = tree.categorize(row)
-            prediction = addDicts(treeClassification, prediction)
-        return prediction
+        votes = self.predict_batch([row])[0]
+        return {cls: int(v) for cls, v in zip(self.classes, votes) if v > 0}
 
 
 
@@ -90,4 +168,8 @@ if __name__ == "__main__":
         row = validationRows[i]
         target = validationTargets[i]
         pred = forrest.predict(row)
-        print(f"prediction: {pred} -- real value: {target}")
\ No newline at end of file
+        print(f"prediction: {pred} -- real value: {target}")
+
+    votes = forrest.predict_batch(validationRows)
+    predictions = np.array(forrest.classes)[votes.argmax(axis=1)]
+    print(f"accuracy: {np.mean(predictions == np.array(validationTargets))}")
\ No newline at end of file
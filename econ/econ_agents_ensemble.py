@@ -0,0 +1,210 @@
+#%%
+import os
+import multiprocessing
+import numpy as np
+import matplotlib.pyplot as plt
+from econ_agents_paper import Economy
+
+
+"""
+Monte-Carlo ensembles of the agent model in econ_agents_paper.
+Replicas run in a process pool, each with its own seed.
+The per-period aggregates of every finished replica are folded into streaming statistics and then dropped,
+so memory does not grow with the number of replicas.
+"""
+
+
+class Welford:
+    """ running mean and variance of arrays of a fixed shape """
+    def __init__(self, shape):
+        self.n = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.zeros_like(self.mean)
+
+
+class P2Quantile:
+    """
+        Streaming estimate of the `p`-quantile by the P² algorithm (Jain & Chlamtac),
+        for every entry of arrays of a fixed shape at once. Keeps five markers per entry.
+    """
+    def __init__(self, p, shape):
+        self.p = p
+        self.first = []
+        self.q = np.zeros((5,) + shape)
+        self.n = np.zeros((5,) + shape)
+        self.wanted = np.array([1, 1 + 2*p, 1 + 4*p, 3 + 2*p, 5]).reshape((5,) + (1,) * len(shape)) * np.ones(shape)
+        self.step = np.array([0, p/2, p, (1 + p)/2, 1]).reshape((5,) + (1,) * len(shape))
+
+    def add(self, x):
+        if len(self.first) < 5:
+            self.first.append(np.array(x, dtype=float))
+            if len(self.first) == 5:
+                self.q = np.sort(np.stack(self.first), axis=0)
+                self.n = np.arange(1, 6, dtype=float).reshape(self.step.shape) * np.ones_like(self.q)
+            return
+        q, n = self.q, self.n
+        k = (x >= q[1]).astype(int) + (x >= q[2]) + (x >= q[3])
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        for i in range(1, 5):
+            n[i] += i > k
+        self.wanted += self.step
+        for i in range(1, 4):
+            d = self.wanted[i] - n[i]
+            move = ((d >= 1) & (n[i+1] - n[i] > 1)) | ((d <= -1) & (n[i-1] - n[i] < -1))
+            d = np.sign(d) * move
+            parabolic = q[i] + d / (n[i+1] - n[i-1]) * (
+                (n[i] - n[i-1] + d) * (q[i+1] - q[i]) / (n[i+1] - n[i]) +
+                (n[i+1] - n[i] - d) * (q[i] - q[i-1]) / (n[i] - n[i-1])
+            )
+            neighbour = np.where(d > 0, q[i+1], q[i-1])
+            nNeighbour = np.where(d > 0, n[i+1], n[i-1])
+            linear = q[i] + d * (neighbour - q[i]) / np.where(move, nNeighbour - n[i], 1)
+            inside = (q[i-1] < parabolic) & (parabolic < q[i+1])
+            q[i] = np.where(move, np.where(inside, parabolic, linear), q[i])
+            n[i] += d
+
+    def value(self):
+        if len(self.first) < 5:
+            return np.quantile(np.stack(self.first), self.p, axis=0)
+        return self.q[2].copy()
+
+
+MANIFEST = 'columns.txt'   # names of the columns written to a directory, one per line
+
+
+def columnNames(directory):
+    """ the names of the columns in `directory`, as listed in its manifest """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def writeColumns(directory, columns):
+    """
+        writes every column into `directory/<name>.npy`, overwriting the previous values in place;
+        a file of another shape or dtype is replaced as a whole. The names are added to the manifest.
+    """
+    for name, values in columns.items():
+        path = os.path.join(directory, f"{name}.npy")
+        out = np.load(path, mmap_mode='r+') if os.path.exists(path) else None
+        if out is None or out.shape != values.shape or out.dtype != values.dtype:
+            del out
+            temp = path + '.tmp'
+            np.save(temp, values)
+            os.replace(temp + '.npy', path)
+            continue
+        out[...] = values
+        out.flush()
+        del out
+
+    names = columnNames(directory)
+    missing = [name for name in columns if name not in names]
+    if missing:
+        path = os.path.join(directory, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            f.write(''.join(f"{name}\n" for name in names + missing))
+        os.replace(path + '.tmp', path)
+
+
+def clearColumns(directory):
+    """ removes the columns listed in the manifest of `directory`, and the manifest; other files are kept """
+    for name in columnNames(directory):
+        path = os.path.join(directory, f"{name}.npy")
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        os.remove(os.path.join(directory, MANIFEST))
+
+
+def readColumns(directory):
+    return {name: np.load(os.path.join(directory, f"{name}.npy")) for name in columnNames(directory)}
+
+
+workerState = {}
+
+def initWorker(T, params):
+    workerState['T'] = T
+    workerState['params'] = params
+
+def runReplica(seed):
+    """ the aggregates of one seeded run, as an array (T, nr of aggregates) and their names """
+    economy = Economy(seed=seed, **workerState['params'])
+    rows = [list(aggregates.items()) for aggregates in economy.run(workerState['T'])]
+    names = [name for name, _ in rows[0]]
+    return names, np.array([[value for _, value in row] for row in rows], dtype=float)
+
+
+def runEnsemble(nrReplicas, T, directory, nrWorkers = None, seed = None, quantiles = (0.05, 0.5, 0.95), flushEvery = 10, **params):
+    """
+        Runs `nrReplicas` seeded replicas of `Economy(**params)` for `T` periods in a pool of processes.
+        Per period and aggregate, keeps the mean, standard deviation and `quantiles` over all replicas finished so far.
+        Every `flushEvery` replicas (and at the end) they are written to `directory` as one .npy column of length `T` each,
+        named `<aggregate>_mean`, `<aggregate>_std` and `<aggregate>_q<quantile>`, next to a `nrReplicas` column.
+        The names of the columns are listed in `directory/columns.txt`; the columns of an earlier run listed there are removed first.
+        Replicas are folded in the order of their seeds, so the (order dependent) quantile estimates are reproducible.
+        Returns the final columns.
+    """
+    if nrReplicas < 1:
+        raise ValueError(f"nrReplicas must be at least 1, not {nrReplicas}")
+    os.makedirs(directory, exist_ok=True)
+    clearColumns(directory)
+    seeds = np.random.SeedSequence(seed).spawn(nrReplicas)
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    nrWorkers = nrWorkers or context.cpu_count()
+
+    names = None
+    moments = None
+    estimators = None
+
+    def columns():
+        out = {'nrReplicas': np.full(T, moments.n)}
+        std = moments.std()
+        for j, name in enumerate(names):
+            out[f"{name}_mean"] = moments.mean[:, j]
+            out[f"{name}_std"] = std[:, j]
+            for estimator in estimators:
+                out[f"{name}_q{estimator.p:g}"] = estimator.value()[:, j]
+        return out
+
+    with context.Pool(nrWorkers, initializer=initWorker, initargs=(T, params)) as pool:
+        for done, (replicaNames, trajectory) in enumerate(pool.imap(runReplica, seeds), 1):
+            if names is None:
+                names = replicaNames
+                moments = Welford(trajectory.shape)
+                estimators = [P2Quantile(p, trajectory.shape) for p in quantiles]
+            moments.add(trajectory)
+            for estimator in estimators:
+                estimator.add(trajectory)
+            if done % flushEvery == 0:
+                writeColumns(directory, columns())
+
+    result = columns()
+    writeColumns(directory, result)
+    return result
+
+
+
+#%%
+if __name__ == '__main__':
+    T = 100
+    stats = runEnsemble(64, T, 'ensemble', seed=0, nrHouseholds=1000, nrFirms=100, nrBanks=30)
+
+    fig, axes = plt.subplots(2, 1, sharex=True)
+    for ax, name in zip(axes, ['output', 'unemployment']):
+        ax.fill_between(range(T), stats[f"{name}_q0.05"], stats[f"{name}_q0.95"], alpha=0.25, label="5% - 95%")
+        ax.plot(stats[f"{name}_q0.5"], label=f"{name}: median")
+        ax.plot(stats[f"{name}_mean"], label=f"{name}: mean")
+        ax.legend()
+    plt.show()
@@ -12,155 +12,327 @@ time t = 1, ..., T
 homogenous non-storable consumption good market
 labor market
 credit services market
+
+Every kind of agent is a struct of arrays: agent i of a kind is row i of all its columns.
+Each phase of a period works on all agents of a kind at once.
+Bankrupt agents are replaced by resetting their rows.
 """
 
 
-def randomExponential(mean):
-    pass
+def randomExponential(rng, mean):
+    return rng.exponential(1.0, np.shape(mean)) * mean
 
-def randomUniform(min, max):
-    pass
+def randomUniform(rng, min, max, size = None):
+    return rng.uniform(min, max, size)
 
 
 
-class Household:
-    pass
+class Households:
+    def __init__(self, n):
+        self.employer = np.full(n, -1)     # index of the employing firm, -1 if unemployed
+        self.savings = np.ones(n)
+        self.income = np.zeros(n)
 
-class Firm:
-    def __init__(self):
-        self.laborProductivity = randomUniform(0, 10)
-        self.fractionRnD = randomUniform(0, 1)
+    def __len__(self):
+        return len(self.employer)
 
-    def netWorth(self):
-        # a stock variable equal to the sum of past retained net profits
-        pass
 
-    def researchAndDevelopment(self):
-        # productivity can be increased by an uncertain amount 
-        # thanks to investments in R&D, determined as a fixed fraction 
-        # of the last periods gross profits
-        fractionRnD = self.fractionRnD
-        rndBudget = self.profits * fractionRnD
-        sales = self.price * self.production
-        z = randomExponential(mean = rndBudget / sales)
-        self.laborProductivity = self.laborProductivity + z
-
-    def decideProductionLaborPrice(self):
-        # By looking at their past experience, each operating firm 
-        # determines the amount of output to be produced 
-        # (hence, the amount of labor to be hired) and the price. 
-        # Expectations on future demand are updated adaptively
-        production = 
-        laborDemand = production / self.laborProductivity
-        pass
+class Firms:
+    def __init__(self, rng, n, wage, workersPerFirm, maxFractionRnD):
+        self.wage = wage
+        self.workersPerFirm = workersPerFirm
+        self.maxFractionRnD = maxFractionRnD
+        self.laborProductivity = randomUniform(rng, 0.5, 1.5, n)
+        self.fractionRnD = randomUniform(rng, 0, maxFractionRnD, n)
+        self.price = 1.2 * wage / self.laborProductivity
+        self.production = self.laborProductivity * workersPerFirm
+        self.netWorth = np.full(n, wage * workersPerFirm)   # a stock variable equal to the sum of past retained net profits
+        self.stock = np.zeros(n)        # output not sold yet
+        self.debt = np.zeros(n)
+        self.interest = np.zeros(n)     # interest due on `debt`
+        self.rndBudget = np.zeros(n)    # last period's R&D spending
+        self.sales = np.zeros(n)        # last period's revenue
+        self.soldOut = np.zeros(n, dtype=bool)
 
-    def produce(self):
-        production = self.laborProductivity * self.labor
-        return production
+    def __len__(self):
+        return len(self.netWorth)
+
+    def researchAndDevelopment(self, rng):
+        # productivity can be increased by an uncertain amount
+        # thanks to investments in R&D, determined as a fixed fraction
+        # of the last periods gross profits
+        mean = np.divide(self.rndBudget, self.sales, out=np.zeros(len(self)), where=self.sales > 0)
+        self.laborProductivity += randomExponential(rng, mean)
 
-    def bookkeeping(self):
+    def decideProductionLaborPrice(self, rng, wage, maxChange):
+        # By looking at their past experience, each operating firm
+        # determines the amount of output to be produced
+        # (hence, the amount of labor to be hired) and the price.
+        # Expectations on future demand are updated adaptively
+        averagePrice = np.average(self.price, weights=self.production + 1e-12)
+        expensive = self.price >= averagePrice
+        rho = randomUniform(rng, 0, maxChange, len(self))
+        eta = randomUniform(rng, 0, maxChange, len(self))
+        self.production *= np.where(self.soldOut & expensive, 1 + rho, np.where(~self.soldOut & ~expensive, 1 - rho, 1))
+        self.price *= np.where(self.soldOut & ~expensive, 1 + eta, np.where(~self.soldOut & expensive, 1 - eta, 1))
+        self.price = np.maximum(self.price, wage / self.laborProductivity)
+        return np.maximum(np.ceil(self.production / self.laborProductivity), 1).astype(int)
+
+    def produce(self, labor):
+        self.production = self.laborProductivity * labor
+        self.stock = self.production.copy()
+
+    def bookkeeping(self, wageBill, dividendShare):
         # calculate profits, update net worth and,
         # if internal resources are enough, pay back debt obligations.
+        # Returns (repaid to the lender, paid out to households).
+        self.sales = self.price * (self.production - self.stock)
+        self.soldOut = self.stock <= 1e-9 * self.production
+        cash = self.netWorth + self.sales
+        repaid = np.minimum(self.debt + self.interest, np.maximum(cash, 0))
+        profits = self.sales - wageBill - self.interest
+        self.netWorth = cash - self.debt - self.interest
+        self.rndBudget = np.where(profits > 0, self.fractionRnD * profits, 0)
+        dividends = np.where(profits > 0, dividendShare * (profits - self.rndBudget), 0)
+        self.netWorth -= self.rndBudget + dividends
+        return repaid, self.rndBudget + dividends
+
+    def replace(self, rng, dead, entrantSize):
+        """
+            bankrupt firms leave; new firms, smaller than the average survivor, take their rows.
+            If no firm survives, the new ones start out like the firms of the first period.
+        """
+        alive = ~dead
+        n = dead.sum()
+        if alive.any():
+            self.laborProductivity[dead] = np.mean(self.laborProductivity[alive]) * randomUniform(rng, 0.9, 1.0, n)
+            self.price[dead] = np.mean(self.price[alive])
+            self.production[dead] = entrantSize * np.mean(self.production[alive])
+            self.netWorth[dead] = entrantSize * np.mean(self.netWorth[alive])
+        else:
+            self.laborProductivity[dead] = randomUniform(rng, 0.5, 1.5, n)
+            self.price[dead] = 1.2 * self.wage / self.laborProductivity[dead]
+            self.production[dead] = self.laborProductivity[dead] * self.workersPerFirm
+            self.netWorth[dead] = self.wage * self.workersPerFirm
+        self.fractionRnD[dead] = randomUniform(rng, 0, self.maxFractionRnD, n)
+        self.stock[dead] = 0
+        self.rndBudget[dead] = 0
+        self.sales[dead] = 0
+        self.soldOut[dead] = False
+
+
+class Banks:
+    def __init__(self, n, equity):
+        self.initialEquity = equity
+        self.equity = np.full(n, equity)   # a stock variable equal to the sum of past retained net profits
+
+    def __len__(self):
+        return len(self.equity)
+
+    def replace(self, dead):
+        """ bankrupt banks get the average equity of the survivors, or their initial equity if none survives """
+        alive = ~dead
+        self.equity[dead] = np.mean(self.equity[alive]) if alive.any() else self.initialEquity
+
+
+def groupRanks(groups, keys):
+    """ the rank of every entry within its group, when each group is ordered by `keys`; also returns that order """
+    order = np.lexsort((keys, groups))
+    sortedGroups = groups[order]
+    starts = np.searchsorted(sortedGroups, sortedGroups, side='left')
+    ranks = np.empty(len(groups), dtype=int)
+    ranks[order] = np.arange(len(groups)) - starts
+    return ranks, order
+
+
+def adjustWorkforce(rng, households, nrFirms, laborDemand, hire = True):
+    """ firms fire randomly chosen workers beyond `laborDemand` and (if `hire`) fill vacancies from the unemployed """
+    employed = np.flatnonzero(households.employer >= 0)
+    employers = households.employer[employed]
+    ranks, _ = groupRanks(employers, rng.random(len(employed)))
+    households.employer[employed[ranks >= laborDemand[employers]]] = -1
+
+    labor = np.bincount(households.employer[households.employer >= 0], minlength=nrFirms)
+    if hire:
+        vacancies = np.repeat(np.arange(nrFirms), np.maximum(laborDemand - labor, 0))
+        unemployed = np.flatnonzero(households.employer < 0)
+        k = min(len(vacancies), len(unemployed))
+        households.employer[rng.permutation(unemployed)[:k]] = rng.permutation(vacancies)[:k]
+        labor = np.bincount(households.employer[households.employer >= 0], minlength=nrFirms)
+    return labor
+
+
+def allocateCredit(rng, firms, banks, need, nrApplications, capitalRequirement, baseRate, riskMarkup):
+    """
+        Firms that need credit apply to up to `nrApplications` random banks, one after the other.
+        Per round, every bank collects its applications, sorts them by financial viability
+        (leverage, lowest first) and satisfies them until its credit supply is exhausted.
+        The interest rate is a markup on `baseRate` that grows with leverage.
+        Returns the loans as arrays (firm, bank, amount, interest).
+    """
+    supply = banks.equity / capitalRequirement
+    firms.debt[:] = 0
+    firms.interest[:] = 0
+    loans = []
+    need = need.copy()
+    for _ in range(nrApplications):
+        applicants = np.flatnonzero(need > 0)
+        if len(applicants) == 0:
+            break
+        bank = rng.integers(len(banks), size=len(applicants))
+        leverage = (firms.debt[applicants] + need[applicants]) / np.maximum(firms.netWorth[applicants], 1e-9)
+        _, order = groupRanks(bank, leverage)
+        applicants, bank, leverage = applicants[order], bank[order], leverage[order]
+        asked = need[applicants]
+        cumAsked = np.cumsum(asked)
+        starts = np.searchsorted(bank, bank, side='left')
+        before = cumAsked - asked - np.where(starts > 0, cumAsked[starts - 1], 0)
+        granted = np.clip(supply[bank] - before, 0, asked)
+        supply -= np.bincount(bank, weights=granted, minlength=len(banks))
+        rate = baseRate * (1 + riskMarkup * np.minimum(leverage, 10))
+        firms.debt[applicants] += granted
+        firms.interest[applicants] += granted * rate
+        need[applicants] -= granted
+        loans.append((applicants, bank, granted, granted * rate))
+    if not loans:
+        return tuple(np.zeros(0, dtype=t) for t in (int, int, float, float))
+    return tuple(np.concatenate(column) for column in zip(*loans))
+
+
+def trade(rng, households, firms, budget, nrVisits):
+    """
+        Every household visits `nrVisits` random firms and buys from the cheapest first.
+        A firm that gets more orders than it has stock serves every order in part;
+        the unspent budget is taken to the next cheapest firm.
+        If a firm ends up with excess supply, it gets rid of the unsold goods at zero costs.
+        Returns what every household spent.
+    """
+    visits = rng.integers(len(firms), size=(len(households), nrVisits))
+    visits = np.take_along_axis(visits, np.argsort(firms.price[visits], axis=1), axis=1)
+    left = budget.copy()
+    for k in range(nrVisits):
+        firm = visits[:, k]
+        wanted = left / firms.price[firm]
+        orders = np.bincount(firm, weights=wanted, minlength=len(firms))
+        served = np.divide(firms.stock, orders, out=np.ones(len(firms)), where=orders > firms.stock)
+        bought = wanted * served[firm]
+        firms.stock -= np.minimum(orders, firms.stock)
+        left -= bought * firms.price[firm]
+    return budget - left
+
+
+
+class Economy:
+    def __init__(
+        self,
+        nrHouseholds = 1000,
+        nrFirms = 100,
+        nrBanks = 30,
+        seed = None,
+        wage = 1.0,               # nominal wage, exogenous
+        propensity = 0.8,         # share of savings and income that households spend
+        dividendShare = 0.5,      # share of profits after R&D paid out to households
+        maxChange = 0.1,          # largest relative change of production and price per period
+        nrApplications = 3,       # number of banks a firm asks for credit
+        capitalRequirement = 0.1, # bank equity per unit of credit supplied
+        baseRate = 0.01,          # exogenous baseline interest rate
+        riskMarkup = 0.1,         # interest markup per unit of leverage
+        nrVisits = 3,             # number of firms a household compares
+        entrantSize = 0.5,        # size of new firms relative to the average survivor
+        maxFractionRnD = 0.1,     # firms spend a random share of their profits below this on R&D
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.wage = wage
+        self.propensity = propensity
+        self.dividendShare = dividendShare
+        self.maxChange = maxChange
+        self.nrApplications = nrApplications
+        self.capitalRequirement = capitalRequirement
+        self.baseRate = baseRate
+        self.riskMarkup = riskMarkup
+        self.nrVisits = nrVisits
+        self.entrantSize = entrantSize
+
+        workersPerFirm = nrHouseholds / nrFirms
+        self.households = Households(nrHouseholds)
+        self.firms = Firms(self.rng, nrFirms, wage, workersPerFirm, maxFractionRnD)
+        self.banks = Banks(nrBanks, wage * nrHouseholds * capitalRequirement / nrBanks)
+        self.transfers = 0.0   # R&D spending and dividends of the last period, shared by all households
+
+    def step(self):
+        """ one period; returns its aggregates """
+        rng, households, firms, banks = self.rng, self.households, self.firms, self.banks
+
+        # 1. check financial viability
+        deadFirms = firms.netWorth < 0
+        if deadFirms.any():
+            households.employer[deadFirms[np.maximum(households.employer, 0)] & (households.employer >= 0)] = -1
+            firms.replace(rng, deadFirms, self.entrantSize)
+        deadBanks = banks.equity < 0
+        if deadBanks.any():
+            banks.replace(deadBanks)
+
+        # 2. R&D
+        firms.researchAndDevelopment(rng)
+
+        # 3. decide on production
+        laborDemand = firms.decideProductionLaborPrice(rng, self.wage, self.maxChange)
+
+        # 4. labor market
+        labor = adjustWorkforce(rng, households, len(firms), laborDemand)
+
+        # 5. if no funds for wages, take on credits; who still cannot pay lets workers go
+        need = np.maximum(self.wage * labor - firms.netWorth, 0)
+        loanFirm, loanBank, loanAmount, loanInterest = allocateCredit(rng, firms, banks, need, self.nrApplications, self.capitalRequirement, self.baseRate, self.riskMarkup)
+        affordable = np.floor((firms.netWorth + firms.debt) / self.wage + 1e-9).astype(int)
+        labor = adjustWorkforce(rng, households, len(firms), np.minimum(labor, affordable), hire=False)
+        wageBill = self.wage * labor
+        firms.netWorth += firms.debt - wageBill
+        banks.equity -= np.bincount(loanBank, weights=loanAmount, minlength=len(banks))
+        households.income = np.where(households.employer >= 0, self.wage, 0) + self.transfers
+
+        # 6. production
+        firms.produce(labor)
+
+        # 7. goods market
+        budget = self.propensity * (households.savings + households.income)
+        spent = trade(rng, households, firms, budget, self.nrVisits)
+        households.savings += households.income - spent
+
+        # 8. bookkeeping
+        repaid, paidOut = firms.bookkeeping(wageBill, self.dividendShare)
+        due = firms.debt + firms.interest
+        repaidShare = np.divide(repaid, due, out=np.ones(len(firms)), where=due > 0)
+        banks.equity += np.bincount(loanBank, weights=repaidShare[loanFirm] * (loanAmount + loanInterest), minlength=len(banks))
+        self.transfers = paidOut.sum() / len(households)
+
+        return {
+            'output': float(firms.production.sum()),
+            'unemployment': float(np.mean(households.employer < 0)),
+            'price': float(np.average(firms.price, weights=firms.production + 1e-12)),
+            'productivity': float(np.mean(firms.laborProductivity)),
+            'credit': float(firms.debt.sum()),
+            'firmBankruptcies': int(deadFirms.sum()),
+            'bankBankruptcies': int(deadBanks.sum()),
+        }
+
+    def run(self, T):
+        """ yields the aggregates of `T` periods """
+        for _ in range(T):
+            yield self.step()
 
 
 
-        pass
-
-
-class Bank:
-    def netWorth(self):
-        # a stock variable equal to the sum of past retained net profits
-        pass
-
-
-class LaborMarket:
-    def __init__(self, households, firms):
-        self.households = households
-        self.firms = firms
-
-    def payWages(self):
-        pass
-
-
-class FinancialMarket:
-    def __init__(self, firms, banks):
-        self.firms = firms
-        self.banks = banks
-
-    def createCreditApplicationsIfRequired(self):
-        # If internal financial resources are in short supply for paying wages, and fill in a fixed number of applications to obtain credit
-        pass
-
-    def allocateCredit(self):
-        # banks allocate credit collecting individual demands, 
-        # sorting them in descending order according to the financial viability of firms, 
-        # and satisfy them until all credit supply has been exhausted
-        # The contractual interest rate is calculated applying a markup 
-        # (function of financial viability) on an exogenously determined baseline.
-        pass
-
-
-class GoodsMarket:
-    def __init__(self, households, firms):
-        self.households = households
-        self.firms = firms
-
-    def trade(self):
-        # Firms post their offer price, 
-        # while consumers are allowed to muddle through searching for a satisfying deal. 
-        # If a firm ends up with excess supply, it gets rid of the unsold goods at zero costs.
-        pass
-
-
-
-households = [Household() for h in range(1000)]
-firms = [Firm() for f in range(100)]
-banks = [Bank() for b in range(30)]
-
-
-for t in range(100):
-
-    # 1. check financial viability
-
-    for f, firm in enumerate(firms):
-        if firm.netWorth() < 0:
-            firms[f] = Firm()
-    for b, bank in enumerate(banks):
-        if bank.netWorth() < 0:
-            banks[b] = Bank()
-
-    # 2. R&D
-
-    for firm in firms:
-        firm.researchAndDevelopment()
-
-    # 3. decide on production
-
-    for firm in firms:
-        firm.decideProductionLaborPrice()
-
-    # 4. labor market
-    
-    lm = LaborMarket(households, firms)
-    lm.payWages()
-
-    # 5. if no funds for wages, take on credits
-
-    fm = FinancialMarket(firms, banks)
-    fm.createCreditApplicationsIfRequired()
-    fm.allocateCredit()
-
-    # 6. production
-    for firm in firms:
-        firm.produce()
-
-    # 7. goods market
-
-    gm = GoodsMarket(households, firms)
-    gm.trade()
-    
-    # 8. bookkeeping 
-    for firm in firms:
-        firm.bookkeeping()
-
-
+#%%
+if __name__ == '__main__':
+    economy = Economy(nrHouseholds=1000, nrFirms=100, nrBanks=30, seed=0)
+    history = list(economy.run(100))
+
+    fig, axes = plt.subplots(3, 1, sharex=True)
+    axes[0].plot([h['output'] for h in history], label="output")
+    axes[0].legend()
+    axes[1].plot([h['unemployment'] for h in history], label="unemployment")
+    axes[1].legend()
+    axes[2].plot([h['firmBankruptcies'] for h in history], label="firm bankruptcies")
+    axes[2].legend()
+    plt.show()
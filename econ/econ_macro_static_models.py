@@ -18,6 +18,61 @@ def radioPlot(labels, stats1, stats2, label1, label2):
     plt.legend()
     plt.show()
 
+
+def fixedPoint(step, x0, tol = 1e-10, maxIter = 1000, memory = 5):
+    """
+        Solves `x = step(x)` by Anderson-accelerated iteration.
+        `x0` has shape (..., n); the leading axes are independent problems that are solved together,
+        and `step` must map such an array to one of the same shape.
+        A problem is done once all entries of its residual `step(x) - x` are below `tol`.
+        Where an accelerated guess does not lower the residual (or leaves the domain of `step`), the plain step is taken instead.
+        Returns (x, number of iterations per problem, converged per problem).
+    """
+    x = np.array(x0, dtype=float)
+    gx = step(x)
+    f = gx - x
+    dG, dF = [], []   # differences of successive step(x) and residuals
+    nrIterations = np.zeros(x.shape[:-1], dtype=int)
+    for _ in range(maxIter):
+        converged = np.all(np.abs(f) < tol, axis=-1)
+        if converged.all():
+            break
+        nrIterations += ~converged
+
+        xNext = gx
+        if dF:
+            F = np.stack(dF, axis=-1)
+            G = np.stack(dG, axis=-1)
+            Ft = np.swapaxes(F, -1, -2)
+            FtF = Ft @ F
+            reg = 1e-10 * np.trace(FtF, axis1=-2, axis2=-1)[..., None, None] + 1e-300
+            gamma = np.linalg.solve(FtF + reg * np.eye(len(dF)), Ft @ f[..., None])
+            guess = gx - (G @ gamma)[..., 0]
+            xNext = np.where(np.all(np.isfinite(guess), axis=-1)[..., None], guess, gx)
+        xNext = np.where(converged[..., None], x, xNext)
+
+        gNext = step(xNext)
+        fNext = gNext - xNext
+        # safeguard: keep an accelerated guess only if it lowers the residual
+        worse = ~(np.max(np.abs(fNext), axis=-1) < np.max(np.abs(f), axis=-1)) & ~converged
+        if dF and worse.any():
+            xNext = np.where(worse[..., None], gx, xNext)
+            gNext = np.where(worse[..., None], step(xNext), gNext)
+            fNext = gNext - xNext
+            for h in dF + dG:
+                h[worse] = 0
+
+        dG.append(gNext - gx)
+        dF.append(fNext - f)
+        if len(dF) > memory:
+            dG.pop(0)
+            dF.pop(0)
+        x, gx, f = xNext, gNext, fNext
+
+    # the last step may have converged, or `maxIter` may have run out before checking
+    converged = np.all(np.abs(f) < tol, axis=-1)
+    return x, nrIterations, converged
+
 #%%
 """
 The neoclassical model is the only macro economic model that still optimizes profit (for firms) and utility (for households)
@@ -38,14 +93,18 @@ def neoclassical(
         Yf = 1,      # expected future productivity
         M0 = 5,      # money supply
         K = 5,       # capital (exogenous)
-        pe = 0.02    # expected future profit
+        pe = 0.02,   # expected future profit
+        tol = 1e-10,
+        maxIter = 1000
 ):
-    
-    # Initialise endogenous variables at arbitrary positive value
-    w = C = I = Y = r = N = P = 1 
-    
-    for _ in range(1000):
-        
+    """
+    Parameters may be arrays; all their combinations (by broadcasting) are solved at once.
+    Returns ((w, C, I, Y, r, N, P), number of iterations, converged); values that did not converge within `maxIter` iterations are not a solution.
+    """
+
+    def step(x):
+        w, C, I, Y, r, N, P = np.moveaxis(x, -1, 0)
+
         # Cobb douglass production
         Y = A * K**a * N**(1-a)
 
@@ -70,11 +129,18 @@ def neoclassical(
         # Price level
         P = (M0 * rn) / ((1 + rn) * b3 * C)
 
-    return w , C , I , Y , r , N , P 
+        return np.stack([w, C, I, Y, r, N, P], axis=-1)
+
+    # Initialise endogenous variables at arbitrary positive value
+    shape = np.broadcast(A, a, b1, b2, b3, G0, Gf, Yf, M0, K, pe).shape
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x, nrIterations, converged = fixedPoint(step, np.ones(shape + (7,)), tol, maxIter)
+    return tuple(np.moveaxis(x, -1, 0)), nrIterations, converged
 
 
-stats1 = neoclassical()
-stats2 = neoclassical(G0=1.5)
+stats1, _, converged1 = neoclassical()
+stats2, _, converged2 = neoclassical(G0=1.5)
+assert converged1 and converged2
 radioPlot(["w" , "C" , "I" , "Y" , "r" , "N" , "P"], stats1, stats2, "baseline", "fiscal policy")
 
 # %%
@@ -109,15 +175,17 @@ def neoclassicalSynthesis(
     Nf = 7    ,  # full employment
     a = 0.3   ,  # capital elasticity of output
     b = 0.4   ,  # household preference for leisure
+    tol = 1e-10,
+    maxIter = 1000
 ):
     """
     https://macrosimulation.org/a_neoclassical_synthesis_model_is_lm_as_ad
+    Parameters may be arrays; all their combinations (by broadcasting) are solved at once.
+    Returns ((Y, C, I, r, U, w, W, P, N), number of iterations, converged); values that did not converge within `maxIter` iterations are not a solution.
     """
 
-    # Endogenous variables
-    Y = C = I = r = P = w = N = W = 1
-
-    for _ in range(100):
+    def step(x):
+        Y, C, I, r, U, w, W, P, N = np.moveaxis(x, -1, 0)
 
         # Goods market equilibrium
         Y = C + I + G0
@@ -146,13 +214,36 @@ def neoclassicalSynthesis(
         # Employment
         N = (Y / (A * K0**a))**(1/(1-a))
 
-    return Y, C, I, r, U, w, W, P, N
+        return np.stack([Y, C, I, r, U, w, W, P, N], axis=-1)
+
+    # Endogenous variables
+    shape = np.broadcast(c0, c1, i0, i1, A, Pe, m0, m1, m2, M0, G0, T0, K0, Nf, a, b).shape
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x, nrIterations, converged = fixedPoint(step, np.ones(shape + (9,)), tol, maxIter)
+    return tuple(np.moveaxis(x, -1, 0)), nrIterations, converged
 
 
-stats1 = neoclassicalSynthesis()
-stats2 = neoclassicalSynthesis(G0=1.125)
+stats1, _, converged1 = neoclassicalSynthesis()
+stats2, _, converged2 = neoclassicalSynthesis(G0=1.125)
+assert converged1 and converged2
 radioPlot(["Y", "C", "I", "r", "U", "w", "W", "P", "N"], stats1, stats2, "baseline", "fiscal policy")
 
+#%%
+# comparative statics: output and employment over a grid of government spending
+G0s = np.linspace(0.5, 1.5, 1000)
+(Y, C, I, r, U, w, W, P, N), nrIterations, converged = neoclassicalSynthesis(G0=G0s)
+if not converged.all():
+    print(f"no equilibrium found for {np.sum(~converged)} values of G0; they are left out")
+fig, axes = plt.subplots(3, 1, sharex=True)
+axes[0].plot(G0s, np.where(converged, Y, np.nan), label="Y")
+axes[0].legend()
+axes[1].plot(G0s, np.where(converged, N, np.nan), label="N")
+axes[1].legend()
+axes[2].plot(G0s, nrIterations, label="iterations")
+axes[2].set_xlabel("G0")
+axes[2].legend()
+plt.show()
+
 
 #%%
 
@@ -90,7 +90,9 @@ Fiscal policy seems to have a stronger effect on employment than monetary policy
 import numpy as np
 import matplotlib.pyplot as plt
 
-def simulate(
+VARS = ['Y', 'L', 'LN', 'r', 'Pi', 'w_nom', 'P']
+
+def simulateBatch(
         G: np.ndarray,       # government spending
         beta: np.ndarray,    # fed inflation/unemployment sensitivity,
         PiT: np.ndarray,     # target inflation
@@ -106,53 +108,59 @@ def simulate(
         p = 1,       # labor productivity
         m = 0.1,     # gains markup
 ):
-    T = len(G)
-
-    Y     = np.ones(T) * 100
-    LN    = np.ones(T) * 100
-    r     = np.ones(T)
-    Pi    = np.ones(T)
-    w_nom = np.ones(T)
-    L     = np.ones(T) * 100
-    P     = np.ones(T)
-
-    # first values
-    # r[0] = 1
-    # A     = (c_a + c_Y * t_a + i_a + G[0]) / (1 - c_Y + c_Y * t_y - i_Y)
-    # alpha = i_r / (1 - c_Y + c_Y * t_y - i_Y)
-    # Y[0] = A - alpha * r[0]
-    # L[0] = Y[0] / p
-    # w_nom[0] = w_a + w_L * L[0]
-    # Pi[0] = PiT[0]
-    # P[0] = (1+m) * w_nom[0] / p
-  
+    """
+        Simulates S scenarios at once.
+        `G`, `beta` and `PiT` are (S, T) arrays, or broadcast to one; the other parameters are scalars or (S,) arrays.
+        Returns a structured (S, T) array with one field per name in `VARS`.
+    """
+    G, beta, PiT = np.broadcast_arrays(*[np.atleast_2d(np.asarray(x, dtype=float)) for x in (G, beta, PiT)])
+    S, T = G.shape
+    w_a, w_L, c_a, c_Y, i_a, i_Y, i_r, t_a, t_y, p, m = [
+        np.broadcast_to(np.asarray(x, dtype=float), (S,))
+        for x in (w_a, w_L, c_a, c_Y, i_a, i_Y, i_r, t_a, t_y, p, m)
+    ]
+
+    out = np.ones((S, T), dtype=[(name, float) for name in VARS])
+    Y, L, LN, r, Pi, w_nom, P = [out[name] for name in VARS]
+    Y[:] = 100
+    LN[:] = 100
+    L[:] = 100
+
+    # these do not change over time
+    alpha = i_r / (1 - c_Y + c_Y * t_y - i_Y)
+    LNt   = (1/w_L) * (p/(1+m) - w_a)
+
     for t in range(1, T):
 
         # 1. given the last interest rate, some output is produced
-        A     = (c_a + c_Y * t_a + i_a + G[t]) / (1 - c_Y + c_Y * t_y - i_Y)
-        alpha = i_r / (1 - c_Y + c_Y * t_y - i_Y)
-        Y[t] = A - alpha * r[t-1]
-        L[t] = Y[t] / p
+        A       = (c_a + c_Y * t_a + i_a + G[:, t]) / (1 - c_Y + c_Y * t_y - i_Y)
+        Y[:, t] = A - alpha * r[:, t-1]
+        L[:, t] = Y[:, t] / p
 
         # 2. unions demand a change in nominal wages 
-        delta_w_nom_normalized = Pi[t-1] - w_L * (L[t] - LN[t])
-        w_nom[t] = w_nom[t-1] + delta_w_nom_normalized * w_nom[t-1]
+        delta_w_nom_normalized = Pi[:, t-1] - w_L * (L[:, t] - LN[:, t])
+        w_nom[:, t] = w_nom[:, t-1] + delta_w_nom_normalized * w_nom[:, t-1]
 
         # 3. under these new wages, the negotiated labor supply LN would be:
-        LN[t] = (1/w_L) * (p/(1+m) - w_a)
+        LN[:, t] = LNt
 
         # 4. firms adjust prices to maintain $m$
-        P[t] = (1+m) * w_nom[t] / p
+        P[:, t] = (1+m) * w_nom[:, t] / p
 
         # 5. this increases inflation
-        Pi[t] = Pi[t-1] - w_L * (L[t] - LN[t])
-        # Pi[t] = (P[t] - P[t-1]) / P[t-1] <-- should be the same value
+        Pi[:, t] = Pi[:, t-1] - w_L * (L[:, t] - LN[:, t])
 
         # 6. fed adjusts r to minimize unemployment and inflation
-        r[t] = (LN[t]/p - A)/alpha - (beta[t] * w_L) / (alpha * (1 - beta[t] * w_L * w_L)) * (Pi[t] - PiT[t])
-        r[t] = np.max([0.0, r[t]])
+        r[:, t] = (LN[:, t]/p - A)/alpha - (beta[:, t] * w_L) / (alpha * (1 - beta[:, t] * w_L * w_L)) * (Pi[:, t] - PiT[:, t])
+        r[:, t] = np.maximum(0.0, r[:, t])
 
-    return Y, L, LN, r, Pi, w_nom, P
+    return out
+
+
+def simulate(G: np.ndarray, beta: np.ndarray, PiT: np.ndarray, **params):
+    """ a single scenario; returns the time series Y, L, LN, r, Pi, w_nom, P """
+    out = simulateBatch(G, beta, PiT, **params)[0]
+    return tuple(out[name] for name in VARS)
 
 
 T = 20
@@ -175,3 +183,17 @@ axes[3].plot(Ts, P, label="P")
 axes[3].plot(Ts, w_nom, label="w_nom")
 axes[3].legend()
 # %%
+# policy sweep: all beta/PiT combinations in one batch
+betas = np.linspace(0.1, 3, 60)
+PiTs = np.linspace(0, 0.1, 50)
+bb, pp = np.meshgrid(betas, PiTs, indexing='ij')
+runs = simulateBatch(G=np.ones((1, T)) * 5, beta=bb.reshape(-1, 1), PiT=pp.reshape(-1, 1))
+finalGap = (runs['Pi'][:, -1] - pp.ravel()).reshape(bb.shape)
+
+fig, ax = plt.subplots()
+img = ax.imshow(finalGap.T, origin='lower', aspect='auto', extent=(betas[0], betas[-1], PiTs[0], PiTs[-1]))
+ax.set_xlabel("beta")
+ax.set_ylabel("PiT")
+ax.set_title("Pi - PiT after T periods")
+fig.colorbar(img)
+# %%
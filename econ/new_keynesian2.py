@@ -6,39 +6,53 @@ import matplotlib.pyplot as plt
 
 
 
-def simulate(A, pt, ye):
-    Q = len(A)
+VARS = ['y', 'p', 'rs', 'r']
+
+def simulateBatch(A, pt, ye, a1 = 0.3, a2 = 0.7, b = 1):
+    """
+        Simulates S scenarios at once.
+        `A`, `pt` and `ye` are (S, Q) arrays, or broadcast to one; `a1`, `a2` and `b` are scalars or (S,) arrays.
+        Returns a structured (S, Q) array with one field per name in `VARS`.
+    """
+    A, pt, ye = np.broadcast_arrays(*[np.atleast_2d(np.asarray(x, dtype=float)) for x in (A, pt, ye)])
+    S, Q = A.shape
+    a1, a2, b = [np.broadcast_to(np.asarray(x, dtype=float), (S,)) for x in (a1, a2, b)]
 
     # Create arrays to store simulated data
-    y = np.zeros(Q)  # Income/output
-    p = np.zeros(Q)  # Inflation rate
-    r = np.zeros(Q)  # Real interest rate
-    rs = np.zeros(Q)  # Stabilizing interest rate
-
-    # Set constant parameter values
-    a1 = 0.3  # Sensitivity of inflation with respect to output gap
-    a2 = 0.7  # Sensitivity of output with respect to interest rate
-    b = 1     # Sensitivity of the central bank to inflation gap
+    out = np.zeros((S, Q), dtype=[(name, float) for name in VARS])
+    y  = out['y']   # Income/output
+    p  = out['p']   # Inflation rate
+    rs = out['rs']  # Stabilizing interest rate
+    r  = out['r']   # Real interest rate
+
+    # a1: Sensitivity of inflation with respect to output gap
+    # a2: Sensitivity of output with respect to interest rate
+    # b:  Sensitivity of the central bank to inflation gap
     a3 = (a1 * (1 / (b * a2) + a2)) ** (-1)
 
     # Initialize endogenous variables at equilibrium values
-    y[0] = ye[0]
-    p[0] = pt[0]
-    rs[0] = (A[0] - ye[0]) / a1
-    r[0] = rs[0]
+    y[:, 0] = ye[:, 0]
+    p[:, 0] = pt[:, 0]
+    # (3) Stabilizing interest rate, for all periods at once
+    rs[:] = (A - ye) / a1[:, None]
+    r[:, 0] = rs[:, 0]
 
     # Simulate the model by looping over Q time periods for S different scenarios
     for t in range(1, Q):
         # (1) IS curve
-        y[t] = A[t] - a1 * r[t - 1]
+        y[:, t] = A[:, t] - a1 * r[:, t - 1]
         # (2) Phillips Curve
-        p[t] = p[t - 1] + a2 * (y[t] - ye[t])
-        # (3) Stabilizing interest rate
-        rs[t] = (A[t] - ye[t]) / a1
+        p[:, t] = p[:, t - 1] + a2 * (y[:, t] - ye[:, t])
         # (4) Monetary policy rule, solved for r
-        r[t] = rs[t] + a3 * (p[t] - pt[t])
+        r[:, t] = rs[:, t] + a3 * (p[:, t] - pt[:, t])
+
+    return out
 
-    return y, p, rs, r
+
+def simulate(A, pt, ye):
+    """ a single scenario; returns the time series y, p, rs, r """
+    out = simulateBatch(A, pt, ye)[0]
+    return tuple(out[name] for name in VARS)
 
 
 #%%
@@ -72,3 +86,20 @@ axes[1].legend()
 # plt.plot(rs)
 # plt.plot(r)
 # %%
+
+# Scenarios 1-3 side by side, in one batch
+As  = np.full((3, Q), 10.0)
+pts = np.full((3, Q), 2.0)
+yes = np.full((3, Q), 5.0)
+As[0, 5:]  = 12
+pts[1, 5:] = 3
+yes[2, 5:] = 7
+runs = simulateBatch(As, pts, yes)
+
+img, axes = plt.subplots(2, 1)
+for run, label in zip(runs, ["AD boost", "higher inflation target", "higher potential output"]):
+    axes[0].plot(run['y'], label=f"y: {label}")
+    axes[1].plot(run['p'], label=f"p: {label}")
+axes[0].legend()
+axes[1].legend()
+# %%
@@ -1,5 +1,10 @@
 #%%
 # https://www.youtube.com/watch?v=Yo-xat4cn8M
+from collections import deque
+from itertools import product
+import multiprocessing
+import queue
+
 
 def all(list, predicate):
     for entry in list:
@@ -71,72 +76,284 @@ class Fac:
         return self.func(*inputs)
 
     def __repr__(self) -> str:
-        return f"Fac({self.vars.join(', ')})"
+        return f"Fac({', '.join(self.inputNames)})"
 
 
 #%%
 
 
-def orderVars(vars, facs):
-    # return most constrained var first
-    undecided = [var for var in vars if not var.decided()]
-    undecided.sort(key = lambda var: len(var.range))
-    return undecided
-
-
-def orderVals(var, vars, facs):
-    # return least constraining values first
-    return var.range
-
-
-def updateDomain(var, vars, facs):
-    # restrict domain of var
-    return var
-
-
-bestRating = 0
-@memoize
-def solve(vars, facs, rating = 1):
-    if all(vars, lambda var: var.decided()):
-        if rating > bestRating:
-            bestRating = rating
-        yield (rating, vars)
-
-    else:
-        for var in orderVars(vars, facs):
-            for val in orderVals(var, vars, facs):
+class Domains:
+    """
+        The current range of every variable, by name.
+        Every change is recorded on a trail, so that backtracking
+        only restores what was changed since a `mark` instead of copying all variables.
+    """
+    def __init__(self, vars):
+        self.ranges = {var.name: list(var.range) for var in vars}
+        self.trail = []
+
+    def get(self, name):
+        return self.ranges[name]
+
+    def set(self, name, range):
+        self.trail.append((name, self.ranges[name]))
+        self.ranges[name] = range
+
+    def mark(self):
+        return len(self.trail)
+
+    def undo(self, mark):
+        while len(self.trail) > mark:
+            name, range = self.trail.pop()
+            self.ranges[name] = range
+
+
+def factorIndex(facs):
+    # variable-name -> all factors that variable takes part in
+    index = {}
+    for fac in facs:
+        for inputName in fac.inputNames:
+            index.setdefault(inputName, []).append(fac)
+    return index
+
+
+decidedVarCache = {}
+def decidedVar(name, val):
+    key = (name, val)
+    if key not in decidedVarCache:
+        decidedVarCache[key] = Var(name, [val])
+    return decidedVarCache[key]
+
+
+def supported(fac, name, val, domains):
+    # is there any combination of the other inputs' values for which `fac` is not 0?
+    others = [n for n in fac.inputNames if n != name]
+    for combination in product(*[domains.get(o) for o in others]):
+        assignment = dict(zip(others, combination))
+        assignment[name] = val
+        inputs = [decidedVar(n, assignment[n]) for n in fac.inputNames]
+        if fac.func(*inputs) != 0:
+            return True
+    return False
+
+
+def revise(fac, name, domains):
+    range = domains.get(name)
+    newRange = [val for val in range if supported(fac, name, val, domains)]
+    if len(newRange) < len(range):
+        domains.set(name, newRange)
+        return True
+    return False
+
+
+def propagate(names, domains, index):
+    """
+        AC-3: removes values that no longer have support in some factor,
+        starting from the factors around `names`. Returns False if some range becomes empty.
+    """
+    queue = deque()
+    queued = set()
+    for name in names:
+        for fac in index.get(name, []):
+            for other in fac.inputNames:
+                if other != name and (fac, other) not in queued:
+                    queue.append((fac, other))
+                    queued.add((fac, other))
+    while queue:
+        fac, name = queue.popleft()
+        queued.discard((fac, name))
+        if revise(fac, name, domains):
+            if len(domains.get(name)) == 0:
+                return False
+            for neighbourFac in index.get(name, []):
+                for other in neighbourFac.inputNames:
+                    if other != name and (neighbourFac, other) not in queued:
+                        queue.append((neighbourFac, other))
+                        queued.add((neighbourFac, other))
+    return True
 
-                # Step 1: new variable set with decided value
-                varDecided = var.decide(val)
-                otherVars = allExcept(vars, var)
-                newVars = [*otherVars, varDecided]
-                # print(f"Trying {newVars} ...")
 
-                # Step 2: evaluate set.
-                subRating = 1
-                for fac in facs:
-                    if fac.applicable(newVars):
-                        subRating *= fac.apply(newVars)
-                # If inconsistent, stop here.
-                if subRating == 0:
-                    continue
-                # If another combination was already better
-                # than anything we can get from here, stop too.
-                if bestRating > rating * subRating:
-                    continue
+def orderVars(names, domains, index):
+    # return most constrained var first; ties broken by the number of factors it takes part in
+    undecided = [name for name in names if len(domains.get(name)) > 1]
+    undecided.sort(key = lambda name: (len(domains.get(name)), -len(index.get(name, []))))
+    return undecided
 
-                # Step 3: adjust domains of other variables through lookahead
-                # This step is optional because if we don't do it, inconsistent values
-                # will be filtered out in the next recursion ...
-                # ... but here we have a chance to do something smart
-                # that removes multiple values at once.
-                updatedVars = [
-                    updateDomain(var, newVars, facs)
-                    for var in newVars
-                ]
 
-                for result in solve(updatedVars, facs, rating * subRating):
-                    yield result
+def orderVals(name, domains, index):
+    # return least constraining values first: those that remove the fewest values from the neighbours' ranges
+    def nrRemoved(val):
+        mark = domains.mark()
+        domains.set(name, [val])
+        removed = 0
+        for fac in index.get(name, []):
+            for other in fac.inputNames:
+                if other != name:
+                    removed += sum(1 for v in domains.get(other) if not supported(fac, other, v, domains))
+        domains.undo(mark)
+        return removed
+    return sorted(domains.get(name), key = nrRemoved)
+
+
+def rate(facs, domains):
+    # product of all factors whose inputs are all decided
+    rating = 1
+    for fac in facs:
+        if all(fac.inputNames, lambda n: len(domains.get(n)) == 1):
+            rating *= fac.func(*[decidedVar(n, domains.get(n)[0]) for n in fac.inputNames])
+    return rating
+
+
+class Incumbent:
+    """ the best rating found so far """
+    def __init__(self):
+        self.rating = 0
+
+    def get(self):
+        return self.rating
+
+    def offer(self, rating):
+        # returns True if `rating` is at least as good as the best one so far
+        if rating >= self.rating:
+            self.rating = rating
+            return True
+        return False
+
+
+class SharedIncumbent(Incumbent):
+    """ the best rating found so far by any worker process; backed by a `multiprocessing.Value` """
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value.value
+
+    def offer(self, rating):
+        with self.value.get_lock():
+            if rating >= self.value.value:
+                self.value.value = rating
+                return True
+        return False
+
+
+def branchAndBound(names, index, domains, decided, rating, incumbent):
+    toDecide = orderVars(names, domains, index)
+    if not toDecide:
+        if incumbent.offer(rating):
+            yield (rating, [decidedVar(name, domains.get(name)[0]) for name in names])
+        return
+
+    name = toDecide[0]
+    for val in orderVals(name, domains, index):
+        mark = domains.mark()
+        domains.set(name, [val])
+        if propagate([name], domains, index):
+            # rate the factors that have just become fully decided
+            nowDecided = [n for n in names if len(domains.get(n)) == 1 and n not in decided]
+            newFacs = set(fac for n in nowDecided for fac in index.get(n, []))
+            newFacs = [fac for fac in newFacs if not all(fac.inputNames, lambda n: n in decided)]
+            subRating = rate(newFacs, domains)
+            # If another combination was already better
+            # than anything we can get from here, stop.
+            if subRating > 0 and rating * subRating >= incumbent.get():
+                yield from branchAndBound(names, index, domains, decided | set(nowDecided), rating * subRating, incumbent)
+        domains.undo(mark)
+
+
+def solve(vars, facs, incumbent = None, assignment = ()):
+    """
+        Backtracking search with arc-consistency (AC-3) after every decision.
+        Yields `(rating, vars)` for every complete assignment that is at least as good
+        as the best one found before (branch and bound; factor ratings are assumed to lie in [0, 1]).
+        `assignment`: `(name, value)` pairs to fix before searching.
+    """
+    names = [var.name for var in vars]
+    index = factorIndex(facs)
+    domains = Domains(vars)
+    if incumbent is None:
+        incumbent = Incumbent()
+
+    for name, val in assignment:
+        domains.set(name, [val])
+    if not propagate(names, domains, index):
+        return
+
+    decided = set(n for n in names if len(domains.get(n)) == 1)
+    rating = rate(facs, domains)
+    if rating > 0:
+        yield from branchAndBound(names, index, domains, decided, rating, incumbent)
+
+
+def splitTasks(vars, facs, minNrTasks):
+    """ partial assignments that together cover the whole search space; expanded level by level until there are at least `minNrTasks` """
+    names = [var.name for var in vars]
+    index = factorIndex(facs)
+    domains = Domains(vars)
+    tasks = [()]
+    while len(tasks) < minNrTasks:
+        newTasks = []
+        expanded = False
+        for task in tasks:
+            mark = domains.mark()
+            for name, val in task:
+                domains.set(name, [val])
+            if propagate(names, domains, index):
+                toDecide = orderVars(names, domains, index)
+                if toDecide:
+                    name = toDecide[0]
+                    newTasks += [task + ((name, val),) for val in domains.get(name)]
+                    expanded = True
+                else:
+                    newTasks.append(task)
+            domains.undo(mark)
+        tasks = newTasks
+        if not expanded:
+            break
+    return tasks
+
+
+workerState = {}
+
+def initWorker(vars, facs, bestRating, results):
+    workerState['vars'] = vars
+    workerState['facs'] = facs
+    workerState['incumbent'] = SharedIncumbent(bestRating)
+    workerState['results'] = results
+
+def solveTask(task):
+    nrResults = 0
+    for rating, vars in solve(workerState['vars'], workerState['facs'], workerState['incumbent'], task):
+        workerState['results'].put((rating, [(var.name, var.range[0]) for var in vars]))
+        nrResults += 1
+    return nrResults
+
+
+def solveParallel(vars, facs, nrWorkers = None):
+    """
+        Like `solve`, but the search space is split into partial assignments that a pool of processes explores.
+        All workers prune against one shared best rating.
+        Results are streamed back as they come in; only those that are at least as good as all earlier ones are yielded.
+    """
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    nrWorkers = nrWorkers or context.cpu_count()
+    tasks = splitTasks(vars, facs, 4 * nrWorkers)
+    bestRating = context.Value('d', 0.0)
+    results = context.Queue()
+
+    best = 0
+    with context.Pool(nrWorkers, initializer=initWorker, initargs=(vars, facs, bestRating, results)) as pool:
+        counts = pool.map_async(solveTask, tasks)
+        received = 0
+        while not counts.ready() or received < sum(counts.get()):
+            try:
+                rating, assignment = results.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            received += 1
+            if rating >= best:
+                best = rating
+                yield (rating, [decidedVar(name, val) for name, val in assignment])
+        counts.get()
 
 
 
@@ -150,29 +367,42 @@ def differentColor(state1, state2):
             return 0
     return 1
 
-wa = Var('WA', colors)
-nt = Var('NT', colors)
-wa_nt = Fac(['WA', 'NT'], differentColor)
-sa = Var('SA', colors)
-wa_sa = Fac(['WA', 'SA'], differentColor)
-nt_sa = Fac(['NT', 'SA'], differentColor)
-qu = Var('QU', colors)
-nt_qu = Fac(['NT', 'QU'], differentColor)
-sa_qu = Fac(['SA', 'QU'], differentColor)
-nw = Var('NW', colors)
-qu_nw = Fac(['QU', 'NW'], differentColor)
-sa_nw = Fac(['SA', 'NW'], differentColor)
-vc = Var('VC', colors)
-sa_vc = Fac(['SA', 'VC'], differentColor)
-nw_vc = Fac(['NW', 'VC'], differentColor)
-ta = Var('TA', colors)
-
-
-vars = [wa, nt, sa, qu, nw, vc, ta]
-facs = [wa_nt, wa_sa, nt_sa, nt_qu, sa_qu, qu_nw, sa_nw, sa_vc, nw_vc]
-
-for i, result in enumerate(solve(vars, facs)):
-    print(i, result)
+if __name__ == '__main__':
+    wa = Var('WA', colors)
+    nt = Var('NT', colors)
+    wa_nt = Fac(['WA', 'NT'], differentColor)
+    sa = Var('SA', colors)
+    wa_sa = Fac(['WA', 'SA'], differentColor)
+    nt_sa = Fac(['NT', 'SA'], differentColor)
+    qu = Var('QU', colors)
+    nt_qu = Fac(['NT', 'QU'], differentColor)
+    sa_qu = Fac(['SA', 'QU'], differentColor)
+    nw = Var('NW', colors)
+    qu_nw = Fac(['QU', 'NW'], differentColor)
+    sa_nw = Fac(['SA', 'NW'], differentColor)
+    vc = Var('VC', colors)
+    sa_vc = Fac(['SA', 'VC'], differentColor)
+    nw_vc = Fac(['NW', 'VC'], differentColor)
+    ta = Var('TA', colors)
+
+
+    vars = [wa, nt, sa, qu, nw, vc, ta]
+    facs = [wa_nt, wa_sa, nt_sa, nt_qu, sa_qu, qu_nw, sa_nw, sa_vc, nw_vc]
+
+    for i, result in enumerate(solve(vars, facs)):
+        print(i, result)
+
+    # a bigger map: a strip of 300 regions, every region bordering its two successors
+    strip = [Var(f'R{i}', colors) for i in range(300)]
+    borders = [
+        Fac([strip[i].name, strip[j].name], differentColor)
+        for i in range(len(strip)) for j in [i + 1, i + 2] if j < len(strip)
+    ]
+    rating, solution = next(solve(strip, borders))
+    print(rating, solution[:5])
+
+    for i, result in enumerate(solveParallel(vars, facs, 4)):
+        print(i, result)
 
 
 # %%
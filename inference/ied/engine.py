@@ -1,6 +1,7 @@
 from ied.base import Fact, Object, Relation, TestableRelation, Rule, Variable
-from ied.substitution import matchLeftToRight, matchRightToLeft, substituteRule, substituteExpression
+from ied.substitution import Substitution, matchLeftToRight, matchRightToLeft, substituteRule, substituteExpression
 from ied.helpers import unique
+from ied.store import FactStore, RuleStore
 from typing import List
 
 
@@ -17,13 +18,12 @@ def log(func):
 class InferenceEngine:
 
     def __init__(self):
-        self.facts: List[Fact] = []
-        self.rules: List[Rule] = []
+        self.facts = FactStore()
+        self.rules = RuleStore()
 
 
     def addFact(self, *expression):
-        if expression not in self.facts:
-            self.facts.append(expression)
+        self.facts.add(expression)
         if len(expression) > 1:
             for word in expression:
                 if isinstance(word, Fact):
@@ -31,8 +31,7 @@ class InferenceEngine:
 
 
     def addRule(self, rule: Rule):
-        if rule not in self.rules:
-            self.rules.append(rule)
+        self.rules.add(rule)
         for expression in rule.condition:
             if not isinstance(expression, tuple):
                 if not isinstance(expression, Variable):
@@ -45,7 +44,7 @@ class InferenceEngine:
     
     def __findInFacts(self, *expression):
         foundDicts = []
-        for fact in self.facts:
+        for fact in self.facts.candidates(expression):
             match = matchRightToLeft(fact, expression)
             if match is not False:
                 foundDicts.append(match)
@@ -54,7 +53,7 @@ class InferenceEngine:
 
     def __findCandidateRules(self, *expression):
         candidates = []
-        for rule in self.rules:
+        for rule in self.rules.candidates(expression):
             match = matchLeftToRight(rule.consequence, expression)
             if match is not False:
                 candidates.append(substituteRule(rule, match))
@@ -65,7 +64,7 @@ class InferenceEngine:
 
         # objects just evaluate to true
         if len(expression) == 1 and isinstance(expression[0], Object):
-            return [{}]
+            return [Substitution()]
 
         # find in kb
         foundDicts = self.__findInFacts(*expression)
@@ -1,22 +1,38 @@
+from ied.substitution import Substitution
+
+
+def asHashable(entry):
+    if type(entry) is dict:
+        return Substitution(entry)
+    return entry
+
+
 def unique(lst):
+    seen = set()
     ulst = []
     for e in lst:
-        if e not in ulst:
+        e = asHashable(e)
+        if e not in seen:
+            seen.add(e)
             ulst.append(e)
     return ulst
 
 
 def listUnion(list1, list2):
     uList = list1
+    seen = set(asHashable(entry) for entry in uList)
     for entry in list2:
-        if entry not in uList:
+        entry = asHashable(entry)
+        if entry not in seen:
+            seen.add(entry)
             uList.append(entry)
     return uList
 
 
 def listIntersection(list1, list2):
+    inList2 = set(asHashable(entry) for entry in list2)
     iList = []
     for entry in list1:
-        if entry in list2:
+        if asHashable(entry) in inList2:
             iList.append(entry)
     return iList
@@ -1,7 +1,7 @@
 from ied.engine import InferenceEngine
 from ied.substitution import substituteExpression
 from ied.base import TestableRelation
-from ied.helpers import unique
+from ied.helpers import unique, asHashable
 
 
 def __andTestFunction(ie: InferenceEngine, *statements):
@@ -14,8 +14,7 @@ def __andTestFunction(ie: InferenceEngine, *statements):
     for substDict in substDicts:
         substStatements = [substituteExpression(statement, substDict) for statement in statements[1:]]
         subSubstDicts = __andTestFunction(ie, *substStatements)
-        [d.update(substDict) for d in subSubstDicts]
-        fullSubstDicts += subSubstDicts
+        fullSubstDicts += [asHashable(d).extend(substDict) for d in subSubstDicts]
     return unique(fullSubstDicts)
 
 And = TestableRelation('and', __andTestFunction)
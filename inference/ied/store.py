@@ -0,0 +1,114 @@
+from ied.base import Variable
+from collections import defaultdict
+
+
+def isHashable(word):
+    try:
+        hash(word)
+        return True
+    except TypeError:
+        return False
+
+
+class FactStore:
+    """
+        Facts in insertion order, indexed by arity and by the word at every position.
+        A query only needs to look at the facts that share its most selective ground word;
+        the relation symbol is just the word at position 0.
+    """
+
+    def __init__(self):
+        self.facts = []
+        self.known = set()
+        self.index = defaultdict(list)      # (arity, position, word) -> fact-numbers, ascending
+        self.byArity = defaultdict(list)    # arity -> fact-numbers, ascending
+
+    def add(self, fact):
+        if isHashable(fact):
+            if fact in self.known:
+                return False
+            self.known.add(fact)
+        elif fact in self.facts:
+            return False
+        nr = len(self.facts)
+        self.facts.append(fact)
+        self.byArity[len(fact)].append(nr)
+        for position, word in enumerate(fact):
+            if isHashable(word):
+                self.index[(len(fact), position, word)].append(nr)
+        return True
+
+    def candidates(self, expression):
+        """ all facts that could match `expression`, in insertion order """
+        arity = len(expression)
+        bucket = self.byArity.get(arity, [])
+        for position, word in enumerate(expression):
+            if isinstance(word, Variable) or not isHashable(word):
+                continue
+            wordBucket = self.index.get((arity, position, word), [])
+            if len(wordBucket) < len(bucket):
+                bucket = wordBucket
+        return [self.facts[nr] for nr in bucket]
+
+    def __contains__(self, fact):
+        if isHashable(fact):
+            return fact in self.known
+        return fact in self.facts
+
+    def __iter__(self):
+        return iter(self.facts)
+
+    def __len__(self):
+        return len(self.facts)
+
+
+class RuleStore:
+    """
+        Rules in insertion order, indexed by the words of their consequence.
+        Contrary to facts, a rule's consequence may hold a variable at some position,
+        which matches any word there; those rules are kept in a separate bucket per position.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.known = set()
+        self.index = defaultdict(list)          # (arity, position, word) -> rule-numbers, ascending
+        self.variableIndex = defaultdict(list)  # (arity, position) -> rule-numbers, ascending
+        self.byArity = defaultdict(list)
+
+    def add(self, rule):
+        if rule in self.known:
+            return False
+        self.known.add(rule)
+        nr = len(self.rules)
+        self.rules.append(rule)
+        consequence = rule.consequence
+        self.byArity[len(consequence)].append(nr)
+        for position, word in enumerate(consequence):
+            if isinstance(word, Variable) or not isHashable(word):
+                self.variableIndex[(len(consequence), position)].append(nr)
+            else:
+                self.index[(len(consequence), position, word)].append(nr)
+        return True
+
+    def candidates(self, expression):
+        """ all rules whose consequence could match `expression`, in insertion order """
+        arity = len(expression)
+        bucket = self.byArity.get(arity, [])
+        for position, word in enumerate(expression):
+            if not isHashable(word):
+                continue
+            wordBucket = self.index.get((arity, position, word), [])
+            variableBucket = self.variableIndex.get((arity, position), [])
+            if len(wordBucket) + len(variableBucket) < len(bucket):
+                bucket = sorted(wordBucket + variableBucket)
+        return [self.rules[nr] for nr in bucket]
+
+    def __contains__(self, rule):
+        return rule in self.known
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
@@ -1,6 +1,36 @@
 from ied.base import Variable, Rule
 
 
+class Substitution(dict):
+    '''
+        An immutable variable -> value mapping.
+        Because it is hashable, lists of substitutions can be deduplicated, unioned and intersected through sets.
+        Compares equal to a plain dict with the same entries.
+    '''
+
+    def __hash__(self):
+        if not hasattr(self, '_hash'):
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+    def __immutable(self, *args, **kwargs):
+        raise TypeError('Substitution is immutable; use `extend` to create a new one.')
+
+    __setitem__ = __immutable
+    __delitem__ = __immutable
+    update = __immutable
+    pop = __immutable
+    popitem = __immutable
+    clear = __immutable
+    setdefault = __immutable
+
+    def extend(self, other):
+        return Substitution({**self, **other})
+
+    def __repr__(self):
+        return dict.__repr__(self)
+
+
 
 def variableMatches(w1: Variable, w2):
     if isinstance(w2, Variable):
@@ -26,7 +56,7 @@ def matchLeftToRight(expression1, expression2):
                 return False
         elif w1 != w2:
             return False
-    return translationDict
+    return Substitution(translationDict)
 
 
 def matchRightToLeft(expression1, expression2):
@@ -319,3 +319,26 @@ allDangerousVeis = ie.evalExpression(And, (Or, (laharSim, V, L), (ashfallSim, V,
 
 assert dangerousVeis == [{V: vei3, L: lahar3}, {V: vei4, L: lahar4}]
 assert allDangerousVeis == [{V: vei3, L: lahar3}, {V: vei4, L: lahar4}, {V: vei4, L: ashf4}]
+
+
+likes = Relation('likes')
+pizza = Object('pizza')
+pasta = Object('pasta')
+P = Variable('P')
+people = [Object(f'person{i}') for i in range(1000)]
+for i, person in enumerate(people):
+    ie.addFact(likes, person, pizza if i % 2 == 0 else pasta)
+ie.addFact(likes, people[0], pizza)
+assert len(ie.facts.candidates((likes, P, pizza))) == 500
+assert len(ie.facts.candidates((likes, people[3], P))) == 1
+assert len(ie.rules.candidates((son, P, M, F))) == 1
+assert ie.evalExpression(likes, people[3], P) == [{P: pasta}]
+assert len(ie.evalExpression(likes, P, pizza)) == 500
+
+
+from ied.substitution import Substitution
+from ied.helpers import unique, listIntersection
+assert unique([{X: anne}, Substitution({X: anne}), {X: bill}]) == [{X: anne}, {X: bill}]
+assert listIntersection([{X: anne}, {X: bill}], [{X: bill}]) == [{X: bill}]
+assert all(isinstance(d, Substitution) for d in daughters)
+assert len({Substitution({X: anne, M: bill}), Substitution({M: bill, X: anne})}) == 1
@@ -18,11 +18,121 @@ class Var:
         return hash(self.name)
 
 
+notFound = object()
+
+
+class Substitution:
+    """
+        Persistent (immutable) map from variables to values: a hash array mapped trie.
+        `extend` copies only the path from the root to the changed entry (at most 13 nodes of 32 slots),
+        so all branches of a search can share the bindings they have in common.
+        Lookup and extend are O(log32 n).
+    """
+    __slots__ = ('root', 'size', 'walked')
+
+    def __init__(self, root=None, size=0):
+        self.root = root
+        self.size = size
+        self.walked = None   # walk-cache: path compression without mutating the map itself
+
+    def get(self, key, default=None):
+        node = self.root
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        shift = 0
+        while node is not None:
+            entry = node[(h >> shift) & 31]
+            if entry is None:
+                return default
+            if type(entry) is tuple:
+                return entry[2] if entry[0] == h and entry[1] == key else default
+            if type(entry) is dict:   # collision bucket
+                return entry.get(key, default)
+            node = entry
+            shift += 5
+        return default
+
+    def extend(self, key, val) -> 'Substitution':
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        root, added = Substitution.__insert(self.root, h, key, val, 0)
+        return Substitution(root, self.size + added)
+
+    @staticmethod
+    def __insert(node, h, key, val, shift):
+        if shift >= 64:
+            bucket = dict(node) if node else {}
+            added = 0 if key in bucket else 1
+            bucket[key] = val
+            return bucket, added
+        newNode = list(node) if node is not None else [None] * 32
+        idx = (h >> shift) & 31
+        entry = newNode[idx]
+        if entry is None:
+            newNode[idx] = (h, key, val)
+            return newNode, 1
+        if type(entry) is tuple:
+            if entry[0] == h and entry[1] == key:
+                newNode[idx] = (h, key, val)
+                return newNode, 0
+            sub, _ = Substitution.__insert(None, entry[0], entry[1], entry[2], shift + 5)
+            sub, added = Substitution.__insert(sub, h, key, val, shift + 5)
+            newNode[idx] = sub
+            return newNode, added
+        newNode[idx], added = Substitution.__insert(entry, h, key, val, shift + 5)
+        return newNode, added
+
+    def items(self):
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if type(node) is dict:
+                yield from node.items()
+                continue
+            for entry in node:
+                if entry is None:
+                    continue
+                if type(entry) is tuple:
+                    yield entry[1], entry[2]
+                else:
+                    stack.append(entry)
+
+    def __contains__(self, key):
+        return self.get(key, notFound) is not notFound
+
+    def __getitem__(self, key):
+        val = self.get(key, notFound)
+        if val is notFound:
+            raise KeyError(key)
+        return val
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __repr__(self):
+        return f"Substitution({dict(self.items())})"
+
+    @staticmethod
+    def fromDict(d: dict) -> 'Substitution':
+        subst = emptySubst
+        for key, val in d.items():
+            subst = subst.extend(key, val)
+        return subst
+
+
+emptySubst = Substitution()
+
 falseSubst = None
 
-Subst = Union[dict, falseSubst]
+Subst = Union[Substitution, falseSubst]
 
-SubstStream = Iterator[Subst]
+# A stream of substitutions is either
+#   - `emptyStream`:          no (more) substitutions
+#   - a pair `(subst, rest)`: a mature stream; one substitution and the rest of the stream
+#   - a `Suspension`:         an immature stream; a thunk that returns a stream when called
+SubstStream = Union[None, tuple, Callable[[], Any]]
 
 # A goal is a reified relation - the relation's parameters & variables are set, now the goal can be used to stream substitutions through.
 Goal = Callable[[Subst], SubstStream]
@@ -31,23 +141,65 @@ Goal = Callable[[Subst], SubstStream]
 Relation = Callable[[List[Any]], Goal]
 
 
+emptyStream = None
+
+
 def isVar(x):
     return isinstance(x, Var)
 
 
-def emptyStream() -> SubstStream:
-    yield {}
+def unit(subst: Subst) -> SubstStream:
+    return (subst, emptyStream)
+
+
+def mplus(stream1: SubstStream, stream2: SubstStream) -> SubstStream:
+    """
+        Merges two streams. When the first one is suspended, the two swap places,
+        so that an infinite branch cannot starve the other one.
+    """
+    if stream1 is emptyStream:
+        return stream2
+    if callable(stream1):
+        return lambda: mplus(stream2, stream1())
+    head, rest = stream1
+    return (head, lambda: mplus(rest, stream2))
+
+
+def bind(stream: SubstStream, goal: Goal) -> SubstStream:
+    """ Feeds every substitution of `stream` through `goal`. Every goal-application is suspended. """
+    if stream is emptyStream:
+        return emptyStream
+    if callable(stream):
+        return lambda: bind(stream(), goal)
+    head, rest = stream
+    return mplus(lambda: goal(head), lambda: bind(rest, goal))
+
+
+def pull(stream: SubstStream) -> SubstStream:
+    """ Trampoline: forces suspensions until the stream is either empty or mature. """
+    while callable(stream):
+        stream = stream()
+    return stream
 
 
 def walk(var: Var, subst: Subst) -> Any:
-    if var in subst:
-        val = subst[var]
-        if isVar(val):
-            return walk(val, subst)
-        else:
-            return val
-    else:
-        return var
+    """ follows a chain of variable-bindings to its end; the result is cached for every variable on the chain """
+    if subst.walked is None:
+        subst.walked = {}
+    cache = subst.walked
+    path = []
+    while isVar(var):
+        if var in cache:
+            var = cache[var]
+            break
+        val = subst.get(var, notFound)
+        if val is notFound:
+            break
+        path.append(var)
+        var = val
+    for v in path:
+        cache[v] = var
+    return var
 
 
 def walkx(x: Any, subst: Subst) -> Any:
@@ -57,109 +209,116 @@ def walkx(x: Any, subst: Subst) -> Any:
         return x
 
 
-def reify(var: Var, subst: Subst) -> Subst:
-    if subst == falseSubst:
+def reify(x: Any, subst: Subst) -> Any:
+    """ Replaces all bound variables in `x` - also those nested in lists - by their values. """
+    x = walkx(x, subst)
+    if isinstance(x, list):
+        return [reify(e, subst) for e in x]
+    return x
+
+
+def extend(subst: Subst, var: Var, val: Any) -> Subst:
+    return subst.extend(var, val)
+
+
+def unify(a, b, subst: Subst) -> Subst:
+    a = walkx(a, subst)
+    b = walkx(b, subst)
+    if a == b:
         return subst
-    if not var in subst:
+    if isVar(a):
+        return extend(subst, a, b)
+    if isVar(b):
+        return extend(subst, b, a)
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return falseSubst
+        for sa, sb in zip(a, b):
+            subst = unify(sa, sb, subst)
+            if subst is falseSubst:
+                return falseSubst
         return subst
-    val = subst[var]
-    if isVar(val):
-        val = walk(val, subst)
-        if not isVar(val):
-            subst[var] = val
-    return subst
+    return falseSubst
+
+
+def conj2(goal1: Goal, goal2: Goal) -> Goal:
+    def conjG(subst: Subst) -> SubstStream:
+        return bind(goal1(subst), goal2)
+    return conjG
 
 
 def serial(subst: Subst, *goals: List[Goal]) -> SubstStream:
-    firstGoal = goals[0]
-    restGoals = goals[1:]
-    stream = firstGoal(subst)
-    for s in stream:
-        if s == falseSubst:
-            yield s
-        if restGoals:
-            sstream = serial(s, *restGoals)
-            for ss in sstream:
-                yield ss
-        else:
-            yield s
+    # nested to the right, so that forcing the stream never recurses through all goals at once
+    goal = goals[-1]
+    for g in reversed(goals[:-1]):
+        goal = conj2(g, goal)
+    return goal(subst)
 
 
 def parallel(subst: Subst, *goals: List[Goal]) -> SubstStream:
-    for goal in goals:
-        stream = goal(subst)
-        for s in stream:
-            yield s
+    stream = emptyStream
+    for goal in reversed(goals):
+        stream = mplus(lambda goal=goal: goal(subst), stream)
+    return stream
 
 
 def andR(*goals: List[Goal]) -> Goal:
     def andG(subst: Subst) -> SubstStream:
-        stream = serial(subst, *goals)
-        for s in stream:
-            yield s
+        return serial(subst, *goals)
     return andG
 
 
 def orR(*goals: List[Goal]) -> Goal:
     def orG(subst: Subst) -> SubstStream:
-        stream = parallel(subst, *goals)
-        for s in stream:
-            yield s
+        return parallel(subst, *goals)
     return orG
 
 
+def delayR(makeGoal: Callable[[], Goal]) -> Goal:
+    """ For recursive relations: the goal is only built once it is needed. """
+    def delayG(subst: Subst) -> SubstStream:
+        return lambda: makeGoal()(subst)
+    return delayG
+
+
 def eqR(a, b) -> Goal:
     def eqG(subst: Subst) -> SubstStream:
-        a = walkx(a, subst)
-        b = walkx(b, subst)
-        if (a == b):
-            yield subst
-        elif isVar(a):
-            subst[a] = b
-            yield subst
-        elif isVar(b):
-            subst[b] = a
-            yield subst
-        elif isinstance(a, list) and isinstance(b, list):
-            subGoals = [eqR(sa, sb) for sa, sb in zip(a, b)]
-            for s in serial(subst, *subGoals):
-                yield s
-        else:
-            yield falseSubst
+        unified = unify(a, b, subst)
+        if unified is falseSubst:
+            return emptyStream
+        return unit(unified)
     return eqG
 
 
-def evalGoal(goal: Goal, targetVars: List[Var], subst: Subst):
-    stream = goal(subst)
-    for s in stream:
-        if s == falseSubst:
-            yield falseSubst
-        else:
-            for v in targetVars:
-                s = reify(v, s)
-            slimS = {}
-            for v in targetVars:
-                if v in s:
-                    slimS[v] = s[v]
-            yield slimS
+def evalGoal(goal: Goal, targetVars: List[Var], subst: Subst) -> Iterator[dict]:
+    if isinstance(subst, dict):
+        subst = Substitution.fromDict(subst)
+    stream = pull(goal(subst))
+    while stream is not emptyStream:
+        s, rest = stream
+        slimS = {}
+        for v in targetVars:
+            if v in s:
+                slimS[v] = reify(v, s)
+        yield slimS
+        stream = pull(rest)
 
 
 def take(n, stream):
     out = []
-    i = -1
+    if n <= 0:
+        return out
     for s in stream:
-        if s is not falseSubst:
-            out.append(s)
-        i += 1
-        if i >= n:
+        out.append(s)
+        if len(out) >= n:
             break
     return out
 
 
 def runN(n, vars: List[Var], goal: Goal):
-    subsStr = evalGoal(goal, vars, {})
+    subsStr = evalGoal(goal, vars, emptySubst)
     return take(n, subsStr)
 
 
 def run(vars: List[Var], goal: Goal):
-    return runN(inf, vars, goal)
\ No newline at end of file
+    return runN(inf, vars, goal)
@@ -1,5 +1,5 @@
 import unittest
-from inference.kanren.main import Var, run, eqR, andR, orR
+from inference.kanren.main import Var, run, runN, eqR, andR, orR, delayR, emptySubst, walk
 
 
 class InferenceEngineTestCase(unittest.TestCase):
@@ -87,6 +87,69 @@ class InferenceEngineTestCase(unittest.TestCase):
         self.assertEqual( results, [{x: "pod"}] )
 
 
+    def testInterleaving(self):
+        x = Var('x')
+        def forever():
+            return orR(delayR(forever))
+        def nat(n):
+            return orR(eqR(x, n), delayR(lambda: nat(n + 1)))
+
+        results = runN(1, [x],
+            orR(forever(), eqR(x, "found"))
+        )
+        self.assertEqual( results, [{x: "found"}] )
+
+        results2 = runN(3, [x],
+            orR(nat(0), eqR(x, "a"))
+        )
+        self.assertEqual( len(results2), 3 )
+        self.assertIn( {x: "a"}, results2 )
+
+
+    def testRunNStopsAfterNSuccesses(self):
+        x = Var('x')
+        results = runN(2, [x],
+            orR(eqR(x, 1), eqR(1, 2), eqR(x, 2), eqR(x, 3))
+        )
+        self.assertEqual( results, [{x: 1}, {x: 2}] )
+
+
+    def testPersistentSubstitution(self):
+        x = Var('x')
+        y = Var('y')
+        s1 = emptySubst.extend(x, y)
+        s2 = s1.extend(y, 1)
+        s3 = s1.extend(y, 2)
+        self.assertEqual( len(emptySubst), 0 )
+        self.assertNotIn( y, s1 )
+        self.assertEqual( walk(x, s2), 1 )
+        self.assertEqual( walk(x, s3), 2 )
+        self.assertEqual( walk(x, s1), y )
+
+
+    def testBranchesDoNotShareBindings(self):
+        x = Var('x')
+        y = Var('y')
+        results = run([x, y],
+            andR(
+                eqR(x, y),
+                orR(eqR(y, 1), eqR(y, 2))
+            )
+        )
+        self.assertEqual( len(results), 2 )
+        self.assertIn( {x: 1, y: 1}, results )
+        self.assertIn( {x: 2, y: 2}, results )
+
+
+    def testDeepConjunction(self):
+        vs = [Var(f"v{i}") for i in range(3000)]
+        goals = [eqR(vs[i], vs[i + 1]) for i in range(len(vs) - 1)]
+        results = run([vs[0]],
+            andR(*goals, eqR(vs[-1], "end"))
+        )
+        self.assertEqual( results, [{vs[0]: "end"}] )
+
+
         
 
 
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from itertools import product
+from inference.yie.ie import Variable, getVariables, matches, substitute
+
+
+"""
+Bottom-up (forward-chaining) evaluation for `yie.InferenceEngine`.
+
+Instead of proving every query top-down, all facts that follow from `ie.facts` and `ie.rules`
+are derived once and stored. This uses semi-naive evaluation: in every round, a rule only fires
+on combinations that involve at least one fact derived in the previous round (the "delta"),
+so no derivation is repeated and recursive rules like `married(X, Y) <= married(Y, X)` need no loop guard.
+
+    store = materialize(ie)
+    toList(store.eval(married, X, Y))
+
+Rule conditions may be atoms, 'and', 'or' and 'unequal'. 'calc' and 'not' only exist top-down.
+"""
+
+
+def toConjunctions(condition):
+    """ rewrites a rule-condition into a list of alternatives, each being a list of atoms """
+    operator = condition[0]
+    if operator == 'and':
+        alternatives = [toConjunctions(c) for c in condition[1:]]
+        return [sum(combination, []) for combination in product(*alternatives)]
+    if operator == 'or':
+        return [conjunction for c in condition[1:] for conjunction in toConjunctions(c)]
+    if operator in ['calc', 'not']:
+        raise Exception(f"'{operator}' cannot be evaluated bottom-up.")
+    return [[condition]]
+
+
+class FactIndex:
+    """ facts, indexed by arity and by the word at every position """
+
+    def __init__(self):
+        self.facts = set()
+        self.byArity = defaultdict(list)
+        self.index = defaultdict(list)
+
+    def add(self, fact):
+        if fact in self.facts:
+            return False
+        self.facts.add(fact)
+        self.byArity[len(fact)].append(fact)
+        for position, word in enumerate(fact):
+            self.index[(len(fact), position, word)].append(fact)
+        return True
+
+    def candidates(self, atom):
+        bucket = self.byArity.get(len(atom), [])
+        for position, word in enumerate(atom):
+            if isinstance(word, Variable) or isinstance(word, tuple):
+                continue
+            wordBucket = self.index.get((len(atom), position, word), [])
+            if len(wordBucket) < len(bucket):
+                bucket = wordBucket
+        return bucket
+
+    def match(self, atom):
+        for fact in self.candidates(atom):
+            tDict = matches(atom, fact)
+            if tDict is not False:
+                yield tDict
+
+    def __contains__(self, fact):
+        return fact in self.facts
+
+    def __len__(self):
+        return len(self.facts)
+
+
+class MaterializedStore:
+
+    def __init__(self, facts, rules):
+        self.rules = []
+        for rule in rules:
+            for conjunction in toConjunctions(rule.condition):
+                self.rules.append((conjunction, rule.consequence))
+        self.all = FactIndex()
+        delta = FactIndex()
+        for fact in facts:
+            if self.all.add(fact):
+                delta.add(fact)
+        self.rounds = 0
+        self.__fixpoint(delta)
+
+    def addFact(self, *fact):
+        """ adds a fact and incrementally derives everything that follows from it """
+        delta = FactIndex()
+        if self.all.add(fact):
+            delta.add(fact)
+            self.__fixpoint(delta)
+
+    def __fixpoint(self, delta):
+        while len(delta) > 0:
+            self.rounds += 1
+            newDelta = FactIndex()
+            for conjunction, consequence in self.rules:
+                for fact in self.__fire(conjunction, consequence, delta):
+                    if fact not in self.all:
+                        newDelta.add(fact)
+            for fact in newDelta.facts:
+                self.all.add(fact)
+            delta = newDelta
+
+    def __fire(self, conjunction, consequence, delta):
+        """ all consequences of a rule that use at least one fact from `delta` """
+        atoms = [atom for atom in conjunction if atom[0] != 'unequal']
+        for i in range(len(atoms)):
+            sources = [self.all] * len(atoms)
+            sources[i] = delta
+            for tDict in self.__join(atoms, sources, conjunction, {}):
+                fact = substitute(consequence, tDict)
+                if len(getVariables(fact)) == 0:
+                    yield fact
+
+    def __join(self, atoms, sources, conjunction, tDict):
+        if len(atoms) == 0:
+            for atom in conjunction:
+                if atom[0] == 'unequal':
+                    a, b = substitute(atom[1:], tDict)
+                    if a == b:
+                        return
+            yield tDict
+            return
+        atom = substitute(atoms[0], tDict)
+        for subTDict in sources[0].match(atom):
+            yield from self.__join(atoms[1:], sources[1:], conjunction, {**tDict, **subTDict})
+
+    def eval(self, *query):
+        yield from self.all.match(query)
+
+    def evalAndSubstitute(self, *query):
+        for tDict in self.eval(*query):
+            yield substitute(query, tDict)
+
+
+def materialize(ie):
+    return MaterializedStore(ie.facts, ie.rules)
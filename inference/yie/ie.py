@@ -1,3 +1,6 @@
+from inference.yie.tabling import TableSpace
+
+
 
 class Object:
     def __init__(self, description):
@@ -88,41 +91,63 @@ def matches(vQuery, fact):
     return tDict
 
 
+def variantKey(query, numbers=None):
+    """
+        Two queries that only differ in the names of their variables are variants of each other;
+        they get the same key, so that they share one answer table.
+    """
+    if numbers is None:
+        numbers = {}
+    key = []
+    for word in query:
+        if isinstance(word, Variable):
+            if word not in numbers:
+                numbers[word] = len(numbers)
+            key.append((Variable, numbers[word], word.cls))
+        elif isinstance(word, tuple):
+            key.append(variantKey(word, numbers))
+        else:
+            key.append(word)
+    return tuple(key)
+
+
 class InferenceEngine:
     def __init__(self):
         self.facts = []
         self.rules = []
-        self.learned = []
-        self.ongoingRules = []
+        self.tables = TableSpace()
 
     def addFact(self, *fact):
         if fact not in self.facts:
             self.facts.append(fact)
+            self.tables.clear()
 
     def addRule(self, condition, consequence):
         rule = Rule(condition, consequence)
         if rule not in self.rules:
             self.rules.append(rule)
-    
-    def addLearned(self, *query):
-        if len(getVariables(query)) == 0:
-            if query not in self.learned:
-                self.learned.append(query)
+            self.tables.clear()
 
     def matchInFacts(self, *query):
-        for fact in self.facts + self.learned:
+        for fact in self.facts:
             tDict = matches(query, fact)
             if tDict is not False:
                 yield tDict
 
     def matchInRules(self, *query):
-        if query not in self.learned:
-            for rule in self.rules:
-                tDict = matches(rule.consequence, query)
-                if tDict:
-                    substRule = Rule(substitute(rule.condition, tDict), query)
-                    self.addLearned(*query)
-                    yield substRule
+        for rule in self.rules:
+            tDict = matches(rule.consequence, query)
+            if tDict is not False:
+                substRule = Rule(substitute(rule.condition, tDict), query)
+                yield substRule
+
+    def solve(self, *query):
+        """ yields all instances of `query` that can be proven from facts and rules """
+        for tDict in self.matchInFacts(*query):
+            yield substitute(query, tDict)
+        for rule in self.matchInRules(*query):
+            for tDict in self.eval(*(rule.condition)):
+                yield substitute(query, tDict)
 
     def eval(self, *query):
         print(f"now evaluating: {query}")
@@ -147,16 +172,10 @@ class InferenceEngine:
                 if operands[0] != operands[1]:
                     yield {}
         else:
-            for tDict in self.matchInFacts(*query):
-                yield tDict
-            for rule in self.matchInRules(*query):
-                if rule not in self.ongoingRules:
-                    self.ongoingRules.append(rule)
-                    for tDict in self.eval(*(rule.condition)):
-                        yield tDict
-                    self.ongoingRules.remove(rule)
-                else:
-                    print("break because rule already going on.")
+            # tabled: every variant of a query is solved once, recursive variants read the answers found so far
+            table = self.tables.table(variantKey(query), lambda: self.solve(*query))
+            for answer in table:
+                yield matches(query, answer)
 
 
     def evalAndSubstitute(self, *query):
@@ -176,10 +195,9 @@ class InferenceEngine:
             if len(restArgs) == 0:
                 yield tDict
             else:
-                restArgs = [substitute(arg, tDict) for arg in restArgs]
-                for subTDict in self.And(*restArgs):
-                    tDict.update(subTDict)
-                    yield tDict
+                substRestArgs = [substitute(arg, tDict) for arg in restArgs]
+                for subTDict in self.And(*substRestArgs):
+                    yield {**tDict, **subTDict}
             
     def Or(self, *args):
         yield
@@ -1,23 +1,116 @@
 """
-    1. trace calls to fib
-    2. table calls to fib
-    3. repeat with yielding fib
+    Tabling: every call-variant is solved only once.
+
+    1. plain functions are memoized in a hashed table
+    2. generator functions get an answer table that is filled incrementally:
+       all consumers of the same call share one producer and read its answers as they come in
+    3. recursive calls (a consumer asking for a call whose producer is currently running)
+       read the answers found so far; the producer is then re-run until no new answers appear
 """
 
+from functools import wraps
+from inspect import isgeneratorfunction
+
+
+class Table:
+    def __init__(self, space, produce):
+        self.space = space
+        self.produce = produce
+        self.answers = []
+        self.known = set()
+        self.producer = None
+        self.complete = False
+        self.readWhileRunning = False
+        self.dependsOnRunning = False
+        self.newInRound = False
+
+    def __iter__(self):
+        i = 0
+        while True:
+            if i < len(self.answers):
+                yield self.answers[i]
+                i += 1
+                continue
+            if self.complete:
+                return
+            if self.producer is None:
+                self.producer = self.produce()
+                self.newInRound = False
+                self.dependsOnRunning = False
+            if self.producer.gi_running:
+                # recursive call: the leader will re-run the producer once it is done
+                self.space.markRecursive(self)
+                return
+            if not self.__advance():
+                return
+
+    def __advance(self):
+        """ pulls one answer from the producer. Returns False if there will be no more answers for now. """
+        self.space.running.append(self)
+        try:
+            answer = next(self.producer)
+        except StopIteration:
+            self.producer = None
+            if self.readWhileRunning and self.newInRound:
+                self.readWhileRunning = False
+                return True
+            if not self.dependsOnRunning:
+                self.complete = True
+            return False
+        finally:
+            self.space.running.pop()
+        if answer not in self.known:
+            self.known.add(answer)
+            self.answers.append(answer)
+            self.newInRound = True
+        return True
+
+
+class TableSpace:
+    """ all tables of one program, keyed by call-variant """
+
+    def __init__(self):
+        self.tables = {}
+        self.running = []
+
+    def table(self, key, produce):
+        if key not in self.tables:
+            self.tables[key] = Table(self, produce)
+        return self.tables[key]
+
+    def markRecursive(self, table):
+        table.readWhileRunning = True
+        position = self.running.index(table)
+        for dependent in self.running[position + 1:]:
+            dependent.dependsOnRunning = True
+
+    def clear(self):
+        self.tables = {}
+
 
 def tabling(f):
     tabling.execs = 0
-    tabling.table = []
-    def wrapped(*args, **kwargs):
-        for (targs, tkwargs), tresult in tabling.table:
-            if args == targs and kwargs == tkwargs:
-                return tresult
-        result = f(*args, **kwargs)
-        tabling.table.append(((args, kwargs), result))
-        tabling.execs += 1
-        print(f"... {tabling.execs} calls made ...")
-        return result
+    space = TableSpace()
+    memory = {}
+
+    if isgeneratorfunction(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            key = (args, frozenset(kwargs.items()))
+            if key not in space.tables:
+                tabling.execs += 1
+            return iter(space.table(key, lambda: f(*args, **kwargs)))
+    else:
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            key = (args, frozenset(kwargs.items()))
+            if key not in memory:
+                memory[key] = f(*args, **kwargs)
+                tabling.execs += 1
+            return memory[key]
+
     wrapped.__name__ = 'w' + f.__name__
+    wrapped.tables = space
     return wrapped
 
 
@@ -34,7 +127,7 @@ def logging(f):
 
 
 if __name__ == '__main__':
-        
+
     @logging
     @tabling
     def fib(n):
@@ -45,8 +138,8 @@ if __name__ == '__main__':
         return fib(n-1) + fib(n-2)
 
     print(fib(7))
+    print(f"... {tabling.execs} calls made ...")
 
-    @logging
     @tabling
     def yfib(n):
         if n == 0:
@@ -58,5 +151,6 @@ if __name__ == '__main__':
                 for f2 in yfib(n-2):
                     yield f1 + f2
 
-    for r in yfib(7):
-        print(r)
\ No newline at end of file
+    for r in yfib(30):
+        print(r)
+    print(f"... {tabling.execs} calls made ...")
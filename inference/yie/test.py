@@ -3,6 +3,8 @@ import sys
 import io
 from inference.yie.ie import InferenceEngine, Object, Relation, Variable, Rule
 from inference.yie.helpers import toList
+from inference.yie.bottomUp import materialize
+from inference.yie.tabling import tabling
 
 
 X = Variable('X')
@@ -265,6 +267,81 @@ class InferenceEngineTestCase(unittest.TestCase):
         self.assertTrue(len(l3) == 0)
 
 
+    def testTabledLeftRecursion(self):
+        ie = InferenceEngine()
+        a, b, c, d = Object('a'), Object('b'), Object('c'), Object('d')
+        parent = Relation('parent')
+        ancestor = Relation('ancestor')
+        ie.addFact(parent, a, b)
+        ie.addFact(parent, b, c)
+        ie.addFact(parent, c, d)
+        ie.addRule(('and', (ancestor, X, Y), (parent, Y, Z)),
+                   (ancestor, X, Z))
+        ie.addRule((parent, X, Y),
+                   (ancestor, X, Y))
+
+        results = toList(ie.evalAndSubstitute(ancestor, a, V))
+        self.assertTrue( set(results) == {(ancestor, a, b), (ancestor, a, c), (ancestor, a, d)} )
+        self.assertTrue( len(toList(ie.eval(ancestor, A, B))) == 6 )
+
+
+    def testTablingGenerators(self):
+        calls = []
+
+        @tabling
+        def yfib(n):
+            calls.append(n)
+            if n == 0:
+                yield 0
+            elif n == 1:
+                yield 1
+            else:
+                for f1 in yfib(n-1):
+                    for f2 in yfib(n-2):
+                        yield f1 + f2
+
+        self.assertTrue( toList(yfib(25)) == [75025] )
+        self.assertTrue( len(calls) == 26 )
+
+
+    def testBottomUpRecursion(self):
+        ie = InferenceEngine()
+        mickey = Object('Mickey')
+        minnie = Object('Minnie')
+        married = Relation('married')
+        ie.addFact(married, mickey, minnie)
+        ie.addRule((married, V, Z), (married, Z, V))
+
+        store = materialize(ie)
+        self.assertTrue( toList(store.eval(married, minnie, mickey)) == [{}] )
+        self.assertTrue( len(toList(store.eval(married, X, Y))) == 2 )
+
+
+    def testBottomUpFamily(self):
+        ie = InferenceEngine()
+        volker = Object('Volker')
+        andreas = Object('Andreas')
+        michael = Object('Michael')
+        bruder = Relation('Bruder')
+        vater = Relation('Vater')
+        ie.addFact(vater, volker, andreas)
+        ie.addFact(vater, volker, michael)
+        ie.addRule((bruder, X, Y),
+                   (bruder, Y, X))
+        ie.addRule(('and', (vater, V, X),
+                           (vater, V, Y),
+                           ('unequal', X, Y)),
+                    (bruder, X, Y))
+
+        store = materialize(ie)
+        self.assertTrue( toList(store.evalAndSubstitute(bruder, Z, andreas)) == [(bruder, michael, andreas)] )
+
+        thomas = Object('Thomas')
+        store.addFact(vater, volker, thomas)
+        self.assertTrue( len(toList(store.eval(bruder, Z, thomas))) == 2 )
+        self.assertTrue( len(toList(store.eval(bruder, X, Y))) == 6 )
+
+
 
 
 
@@ -1,4 +1,5 @@
 #%%
+from mdp import Mdp, scan
 
 states = ['in', 'out']
 gamma = 1.0
@@ -34,30 +35,11 @@ def endState(state):
     return state == 'out'
 
 
-def qValue(state, action):
-    v = 0
-    for nextState in states:
-        p = prob(nextState, state, action)
-        vNow = reward(nextState, state, action)
-        vFut = V_policy_last[nextState]
-        v += p * (vNow + gamma * vFut)
-    return v
+def possibleActions(state):
+    return ['stay', 'leave']
 
 
-def estimateValue(policy, state):
-    if endState(state):
-        return 0
-    else:
-        action = policy(state)
-        return qValue(state, action)
-
-
-def calcDiff(v1, v2):
-    d = 0
-    for key in v1:
-        d += (v1[key] - v2[key])**2
-    return d
-
+mdp = Mdp(states, possibleActions, scan(states, prob, reward), endState, gamma)
 
 
 def stayPolicy(state):
@@ -67,14 +49,8 @@ def leavePolicy(state):
     return 'leave'
 
 for policy in [stayPolicy, leavePolicy]:
-    V_policy = {state: 0 for state in states}
-    diff = 99999
-    while diff > 0.05:
-        V_policy_last = V_policy
-        V_policy = {}
-        for state in states:
-            V_policy[state] = estimateValue(policy, state)
-        diff = calcDiff(V_policy, V_policy_last)
+    strategy = {state: policy(state) for state in states}
+    V_policy = mdp.evalStrategy(strategy, 0.05)
     print(f"{policy.__name__} -> {V_policy}")
 
 
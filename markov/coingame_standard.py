@@ -1,6 +1,7 @@
 #%%
 import scipy.stats as ss
 import numpy.random as nr
+from mdp import TransitionTable, ValueCache
 
 
 #%% domain specific mix-in's
@@ -47,53 +48,54 @@ def reward(nextState, state, action):
         return 10
 
 
+@TransitionTable
+def successors(state, action):
+    return [
+        (nextState, prob(nextState, state, action), reward(nextState, state, action))
+        for nextState in possibleNextStates(state, action)
+    ]
+
+
 #%% core
 
 gamma = 1.0
+T = 50
+
+cache = ValueCache(maxSize=10000)
+
 
-cache = {}
-def memo(qVal):
-    def cachedQVal(policy, state, action):
-        key = f"{state}/{action}"
-        if key in cache:
-            return cache[key]
-        r = qVal(policy, state, action)
-        cache[key] = r
-        return r
-    return cachedQVal
-
-
-@memo
-def cachedValue(policy, state, action):
-    """ expected utility of state given action and policy """
+def cachedValue(policy, state, action, horizon):
+    """ expected utility of state given action and policy, over the next `horizon` rounds """
+    return cache.get(policy, state, action, horizon, lambda: qValue(policy, state, action, horizon))
+
+
+def qValue(policy, state, action, horizon):
     v = 0
-    for nextState in possibleNextStates(state, action):
-        p = prob(nextState, state, action)
-        vNow = reward(nextState, state, action)
-        vFut = value(policy, nextState)
+    for nextState, p, vNow in successors(state, action):
+        vFut = value(policy, nextState, horizon - 1)
         v += p * (vNow + gamma * vFut)
     return v
 
 
-def value(policy, state):
-    """ expected utility of state given policy """
-    if endState(state):
+def value(policy, state, horizon=T):
+    """ expected utility of state given policy, over the next `horizon` rounds """
+    if endState(state) or horizon <= 0:
         return 0
     else:
-        action = policy(state)
-        return cachedValue(policy, state, action)
+        action = policy(state, horizon)
+        return cachedValue(policy, state, action, horizon)
 
 
 #%% evaluation
 
-def stayPolicy(state):
-    if stayPolicy.counter > 0:
-        stayPolicy.counter -= 1
+def stayPolicy(state, horizon):
+    """ stays for the first `stayPolicy.rounds` rounds, then leaves """
+    if T - horizon < stayPolicy.rounds:
         return 'stay'
     return 'leave'
-stayPolicy.counter = 4
+stayPolicy.rounds = 4
 
-def leavePolicy(state):
+def leavePolicy(state, horizon):
     return 'leave'
 
 vPolMax = -99999999
@@ -107,4 +109,29 @@ for policy in [stayPolicy, leavePolicy]:
 
 print(polOpt)
 
+# %% changing a policy: bump its version, so that its cached values are not reused
+stayPolicy.version = 0
+values = {}
+for rounds in range(10):
+    stayPolicy.rounds = rounds
+    stayPolicy.version += 1
+    values[rounds] = value(stayPolicy, 'in')
+    print(f"Staying for {rounds} rounds => {values[rounds]}")
+print(cache.stats())
+
+# after a version bump, values are fresh: the same as with an empty cache
+cache.invalidate()
+for rounds in [0, 4, 9]:
+    stayPolicy.rounds = rounds
+    stayPolicy.version += 1
+    assert value(stayPolicy, 'in') == values[rounds]
+assert values[0] != values[4]
+
+# without a bump, the values of the old policy are reused until it is invalidated
+stayPolicy.rounds = 5
+assert value(stayPolicy, 'in') == values[9]
+cache.invalidate(stayPolicy)
+assert value(stayPolicy, 'in') == values[5]
+print(cache.stats())
+
 # %%
@@ -1,4 +1,5 @@
 #%%
+from mdp import Mdp, scan
 
 gamma = 0.95
 S = [
@@ -56,60 +57,11 @@ def prob(sNext, s, a):
     else:
         return 0
 
-def errorFunc(v1, v2):
-    e = 0
-    for key in v1:
-        e += (v1[key] - v2[key]) ** 2
-    return e
-
-
-def qValue(state, action, Vold):
-    if isEndState(state):
-        return 0
-    v = 0
-    for sNext in S:
-        vNow = reward(sNext, state, action)
-        vFut = Vold[sNext]
-        p = prob(sNext, state, action)
-        v += p * (vNow + gamma * vFut)
-    return v
-
-
-def evalStrategy(strategy):
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.05:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            action = strategy[s]
-            Vnew[s] = qValue(s, action, Vold)
-        error = errorFunc(Vnew, Vold)
-    return Vnew
-
-
-
-def optimalStrategy():
-    strategy = {}
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.05:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            maxQs = -99999
-            for a in possibleActions(s):
-                qs = qValue(s, a, Vold)
-                if qs > maxQs:
-                    maxQs = qs
-                    strategy[s] = a
-            Vnew[s] = maxQs
-        error = errorFunc(Vnew, Vold)
-    return strategy
+mdp = Mdp(S, possibleActions, scan(S, prob, reward), isEndState, gamma)
 
 #%%
-strat = optimalStrategy()
-vStrat = evalStrategy(strat)
+strat = mdp.optimalStrategy()
+vStrat = mdp.evalStrategy(strat, 0.05)
 for s in strat:
     r, c = s.split('/')
     print(f"{s} -- {strat[s]} -- {vStrat[s]}")
@@ -0,0 +1,369 @@
+import heapq
+import time
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sps
+import scipy.sparse.linalg as spl
+
+
+"""
+A shared engine for the MDP scripts in this folder.
+
+A model is described by plain functions over states:
+    possibleActions(state)      -> [action]
+    successors(state, action)   -> [(sNext, p, r)], only the sNext with p > 0
+    isEndState(state)           -> bool
+Scripts that only define `prob(sNext, state, action)` and `reward(sNext, state, action)`
+can get a `successors` function with `scan(S, prob, reward)`, which tries every sNext in S.
+
+`Mdp` asks for every (state, action)'s successors exactly once and compiles them into
+    - integer state- and action-indices
+    - one sparse transition matrix per action (CSR, `P[a][s, sNext]`)
+    - one expected-reward vector per action (`R[a][s] = sum_sNext P[a][s, sNext] * r`)
+After that, value iteration, policy evaluation and policy iteration are just matrix-vector products.
+
+    mdp = Mdp(S, possibleActions, successors, isEndState, gamma)
+    strategy = mdp.optimalStrategy()        # dict: state -> action
+    values = mdp.evalStrategy(strategy)     # dict: state -> value
+
+Successors that are not in S are ignored, so S may be a sample of a larger state space.
+End states have no outgoing transitions, so their value is always 0 (as in the scripts' `qValue`).
+Errors are sums of squared differences between two sweeps, as in the scripts' `errorFunc`.
+
+Besides synchronous sweeps, values can be computed with
+    - `gaussSeidel`: sweeps that update V in place, so later states already see this sweep's values
+    - `prioritizedSweeping`: backs up the state with the largest Bellman residual first
+      and only re-examines the predecessors of states whose value changed
+Every solver leaves a list of per-sweep metrics in `mdp.stats`:
+`{'sweep', 'residual' (largest |change| of a value in the sweep), 'error', 'backups' (total so far), 'time' (seconds so far)}`.
+For prioritized sweeping, a "sweep" is |S| backups.
+"""
+
+
+class TransitionTable:
+    """ `successors(state, action)`, computed only once per (state, action) """
+
+    def __init__(self, successors):
+        self.successors = successors
+        self.table = {}
+
+    def __call__(self, state, action):
+        key = (state, action)
+        if key not in self.table:
+            self.table[key] = list(self.successors(state, action))
+        return self.table[key]
+
+    def clear(self):
+        self.table = {}
+
+    def __len__(self):
+        return len(self.table)
+
+
+class ValueCache:
+    """
+        Finite-horizon values, keyed on (policy, policy version, state, action, horizon),
+        with least-recently-used eviction beyond `maxSize` entries.
+        A policy is identified by the object itself plus its `version` attribute (0 if it has none):
+        after changing what a policy does, bump `policy.version` or call `invalidate(policy)`.
+    """
+
+    def __init__(self, maxSize=100000):
+        self.maxSize = maxSize
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, policy, state, action, horizon, compute):
+        key = (policy, getattr(policy, 'version', 0), state, action, horizon)
+        if key in self.memory:
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        self.misses += 1
+        value = compute()
+        self.memory[key] = value
+        if self.maxSize is not None:
+            while len(self.memory) > self.maxSize:
+                self.memory.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, policy=None):
+        """ forgets all values of `policy`, or all values if no policy is given """
+        if policy is None:
+            self.memory.clear()
+            return
+        for key in [key for key in self.memory if key[0] is policy]:
+            del self.memory[key]
+
+    def stats(self):
+        return {
+            "size": len(self.memory),
+            "maxSize": self.maxSize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def scan(S, prob, reward):
+    """ a `successors` function for models that only define `prob` and `reward`. Costs O(|S|) per call """
+    def successors(state, action):
+        result = []
+        for sNext in S:
+            p = prob(sNext, state, action)
+            if p:
+                result.append((sNext, p, reward(sNext, state, action)))
+        return result
+    return successors
+
+
+class Mdp:
+    def __init__(self, S, possibleActions, successors, isEndState, gamma):
+        self.states = list(S)
+        self.successors = successors if isinstance(successors, TransitionTable) else TransitionTable(successors)
+        self.indexOf = {s: i for i, s in enumerate(self.states)}
+        self.gamma = gamma
+
+        self.actions = []
+        actionIndex = {}
+        for s in self.states:
+            for a in possibleActions(s):
+                if a not in actionIndex:
+                    actionIndex[a] = len(self.actions)
+                    self.actions.append(a)
+
+        nS = len(self.states)
+        nA = len(self.actions)
+        self.allowed = np.zeros((nA, nS), dtype=bool)
+        self.rank = np.full((nA, nS), np.inf)   # position of an action in `possibleActions(state)`, for breaking ties
+        self.isEnd = np.array([bool(isEndState(s)) for s in self.states])
+        self.R = np.zeros((nA, nS))
+        rows = [[] for _ in range(nA)]
+        cols = [[] for _ in range(nA)]
+        data = [[] for _ in range(nA)]
+
+        for i, s in enumerate(self.states):
+            for position, action in enumerate(possibleActions(s)):
+                a = actionIndex[action]
+                self.allowed[a, i] = True
+                self.rank[a, i] = position
+                if self.isEnd[i]:
+                    continue
+                for sNext, p, r in self.successors(s, action):
+                    j = self.indexOf.get(sNext)
+                    if j is None or not p:
+                        continue
+                    rows[a].append(i)
+                    cols[a].append(j)
+                    data[a].append(p)
+                    self.R[a, i] += p * r
+
+        stuck = [s for i, s in enumerate(self.states) if not self.isEnd[i] and not self.allowed[:, i].any()]
+        if stuck:
+            raise ValueError(f"{len(stuck)} states are no end states, but have no possible actions, e.g. {stuck[:5]}")
+
+        self.P = [
+            sps.csr_matrix((data[a], (rows[a], cols[a])), shape=(nS, nS))
+            for a in range(nA)
+        ]
+        # all actions stacked: row `a * nS + s` holds P[a][s, :], for backing up single states
+        stacked = sps.vstack(self.P).tocsr()
+        self.indptr, self.indices, self.data = stacked.indptr, stacked.indices, stacked.data
+        self.actionsOf = [np.flatnonzero(self.allowed[:, i]).tolist() for i in range(nS)]
+        self.stats = []
+
+    def qValues(self, V):
+        """ Q[a, s] for all actions and states; -inf where an action is not possible """
+        Q = np.full((len(self.actions), len(self.states)), -np.inf)
+        for a, P in enumerate(self.P):
+            q = self.R[a] + self.gamma * (P @ V)
+            Q[a, self.allowed[a]] = q[self.allowed[a]]
+        return Q
+
+    def greedy(self, Q):
+        """ the best action per state; on a tie, the one listed first in `possibleActions` """
+        best = Q.max(axis=0)
+        return np.argmin(np.where(Q >= best, self.rank, np.inf), axis=0)
+
+    def valueIteration(self, tolerance=0.05, V=None):
+        """ returns `(V, policy)` as arrays; `policy[s]` is an action-index """
+        V = np.zeros(len(self.states)) if V is None else V
+        self.stats = []
+        start = time.perf_counter()
+        error = np.inf
+        while error > tolerance:
+            Q = self.qValues(V)
+            Vnew = Q.max(axis=0)
+            error = np.sum((Vnew - V) ** 2)
+            self.__record(np.max(np.abs(Vnew - V)), error, len(V) * (len(self.stats) + 1), start)
+            V = Vnew
+        return V, self.greedy(Q)
+
+    def backup(self, i, V):
+        """ max_a Q(s, a) for the single state with index `i` """
+        nS = len(self.states)
+        best = -np.inf
+        for a in self.actionsOf[i]:
+            row = a * nS + i
+            lo, hi = self.indptr[row], self.indptr[row + 1]
+            q = self.R[a, i] + self.gamma * np.dot(self.data[lo:hi], V[self.indices[lo:hi]])
+            if q > best:
+                best = q
+        return best
+
+    def gaussSeidel(self, tolerance=0.05, V=None, order=None):
+        """
+            value iteration with in-place updates, visiting states in `order` (default: the order of S).
+            Visiting states before their predecessors (e.g. latest time first) speeds up convergence.
+            Returns `(V, policy)` as arrays
+        """
+        V = np.zeros(len(self.states)) if V is None else V.copy()
+        order = range(len(V)) if order is None else order
+        self.stats = []
+        start = time.perf_counter()
+        backups = 0
+        error = np.inf
+        while error > tolerance:
+            error = 0
+            residual = 0
+            for i in order:
+                v = self.backup(i, V)
+                change = abs(v - V[i])
+                error += change ** 2
+                residual = max(residual, change)
+                V[i] = v
+            backups += len(V)
+            self.__record(residual, error, backups, start)
+        return V, self.greedy(self.qValues(V))
+
+    def predecessors(self):
+        """ CSR arrays whose row `j` lists every state `i` that can lead to `j`, with max_a P[a][i, j] """
+        reach = self.P[0]
+        for P in self.P[1:]:
+            reach = reach.maximum(P)
+        reach = reach.T.tocsr()
+        return reach.indptr, reach.indices, reach.data
+
+    def prioritizedSweeping(self, threshold=1e-3, V=None, maxBackups=None):
+        """
+            backs up states in the order of their Bellman residual |max_a Q(s, a) - V(s)|
+            until no state's residual can exceed `threshold`. Returns `(V, policy)` as arrays.
+            After a state's value changes by `delta`, the residual of a predecessor `j` can have grown
+            by at most `gamma * max_a P[a][j, i] * |delta|`; priorities accumulate these bounds,
+            so predecessors are re-queued without backing them up.
+        """
+        nS = len(self.states)
+        V = np.zeros(nS) if V is None else V.copy()
+        predPtr, predIndices, predProbs = self.predecessors()
+        self.stats = []
+        start = time.perf_counter()
+
+        priority = np.zeros(nS)
+        for i in range(nS):
+            priority[i] = abs(self.backup(i, V) - V[i])
+        queue = [(-priority[i], i) for i in range(nS) if priority[i] > threshold]
+        heapq.heapify(queue)
+        backups = nS
+        self.__record(priority.max(initial=0), 0, backups, start)
+
+        sweepResidual = 0
+        sweepError = 0
+        nextReport = backups + nS
+        while queue and (maxBackups is None or backups < maxBackups):
+            negPriority, i = heapq.heappop(queue)
+            if -negPriority != priority[i]:
+                continue  # stale entry; the state has been re-queued with a higher priority
+            priority[i] = 0
+            v = self.backup(i, V)
+            change = abs(v - V[i])
+            V[i] = v
+            backups += 1
+            sweepResidual = max(sweepResidual, change)
+            sweepError += change ** 2
+            if change > 0:
+                for k in range(predPtr[i], predPtr[i + 1]):
+                    j = predIndices[k]
+                    priority[j] += self.gamma * predProbs[k] * change
+                    if priority[j] > threshold:
+                        heapq.heappush(queue, (-priority[j], j))
+            if backups >= nextReport:
+                self.__record(sweepResidual, sweepError, backups, start)
+                sweepResidual = 0
+                sweepError = 0
+                nextReport = backups + nS
+        self.__record(sweepResidual, sweepError, backups, start)
+        return V, self.greedy(self.qValues(V))
+
+    def __record(self, residual, error, backups, start):
+        self.stats.append({
+            'sweep': len(self.stats) + 1,
+            'residual': float(residual),
+            'error': float(error),
+            'backups': backups,
+            'time': time.perf_counter() - start,
+        })
+
+    def policyMatrices(self, policy):
+        """ transition matrix and expected reward vector when following `policy` """
+        nS = len(self.states)
+        P = sps.csr_matrix((nS, nS))
+        R = np.zeros(nS)
+        for a in range(len(self.actions)):
+            chosen = (policy == a)
+            if not chosen.any():
+                continue
+            P = P + sps.diags(chosen.astype(float)) @ self.P[a]
+            R[chosen] = self.R[a, chosen]
+        return P.tocsr(), R
+
+    def policyEvaluation(self, policy, tolerance=0.001, V=None):
+        """ iterative evaluation of a fixed policy: V <- R_pi + gamma * P_pi V """
+        P, R = self.policyMatrices(policy)
+        V = np.zeros(len(self.states)) if V is None else V
+        error = np.inf
+        while error > tolerance:
+            Vnew = R + self.gamma * (P @ V)
+            error = np.sum((Vnew - V) ** 2)
+            V = Vnew
+        return V
+
+    def policySolve(self, policy):
+        """ exact evaluation of a fixed policy: solves (I - gamma * P_pi) V = R_pi """
+        P, R = self.policyMatrices(policy)
+        A = sps.identity(len(self.states), format='csc') - self.gamma * P.tocsc()
+        return spl.spsolve(A, R)
+
+    def policyIteration(self, policy=None, maxIterations=1000):
+        """ returns `(V, policy)` as arrays. Requires every policy to reach an end state if gamma == 1 """
+        if policy is None:
+            policy = np.argmin(self.rank, axis=0)
+        for _ in range(maxIterations):
+            V = self.policySolve(policy)
+            Q = self.qValues(V)
+            best = Q.max(axis=0)
+            # only switch actions on a strict improvement, so that ties cannot make the loop cycle
+            current = Q[policy, np.arange(len(self.states))]
+            improved = best > current + 1e-12
+            if not improved.any():
+                return V, policy
+            policy = np.where(improved, self.greedy(Q), policy)
+        return V, policy
+
+    def toPolicy(self, strategy):
+        return np.array([self.actions.index(strategy[s]) for s in self.states])
+
+    def toStrategy(self, policy):
+        return {s: self.actions[a] for s, a in zip(self.states, policy)}
+
+    def toValues(self, V):
+        return {s: float(v) for s, v in zip(self.states, V)}
+
+    def optimalStrategy(self, tolerance=0.05):
+        _, policy = self.valueIteration(tolerance)
+        return self.toStrategy(policy)
+
+    def evalStrategy(self, strategy, tolerance=0.001):
+        return self.toValues(self.policyEvaluation(self.toPolicy(strategy), tolerance))
@@ -1,4 +1,6 @@
 #%% 
+from mdp import Mdp
+
 gamma = 0.95
 
 S = [  # time / stock price / my debt
@@ -82,101 +84,46 @@ def reward(sNext, state, a):
     return 0
 
 
-def prob(sNext, state, a):
-    ts, vs, ss = state.split('/')
-    tn, vn, sn = sNext.split('/')
+priceMoves = {  # price now -> price next -> probability
+    'low': {'low': 0.4, 'mid': 0.4, 'high': 0.2},
+    'mid': {'low': 0.3, 'mid': 0.4, 'high': 0.3},
+    'high': {'low': 0.2, 'mid': 0.4, 'high': 0.4},
+}
 
-    # excluding impossible combinations
-    if ss == 'sold' and sn != 'sold':
-        return 0
-    if ss in ['low', 'mid', 'high'] and sn == 'none':
-        return 0
-    if a == 'buy':
-        if sn != vs:
-            return 0
-    if a == 'sell' and sn != 'sold':
-        return 0
-    if int(ts) + 1 != int(tn):
-        return 0
-
-    if vs == 'low':
-        if vn == 'low':
-            return 0.4
-        if vn == 'mid':
-            return 0.4
-        if vn == 'high':
-            return 0.2
-    if vs == 'mid':
-        if vn == 'low':
-            return 0.3
-        if vn == 'mid':
-            return 0.4
-        if vn == 'high':
-            return 0.3
-    if vs == 'high':
-        if vn == 'low':
-            return 0.2
-        if vn == 'mid':
-            return 0.4
-        if vn == 'high':
-            return 0.4
-                    
-
-def errorFunc(v1, v2):
-    e = 0
-    for key in v1:
-        e += (v1[key] - v2[key]) ** 2
-    return e
-
-
-def qValue(state, action, Vold):
-    if isEndState(state):
-        return 0
-    v = 0
-    for sNext in S:
-        vNow = reward(sNext, state, action)
-        vFut = Vold[sNext]
-        p = prob(sNext, state, action)
-        v += p * (vNow + gamma * vFut)
-    return v
-
-
-def evalStrategy(strategy):
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.001:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            action = strategy[s]
-            Vnew[s] = qValue(s, action, Vold)
-        error = errorFunc(Vnew, Vold)
-    return Vnew
-
-
-def optimalStrategy():
-    strategy = {}
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.05:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            maxQs = -99999
-            for a in possibleActions(s):
-                qs = qValue(s, a, Vold)
-                if qs > maxQs:
-                    maxQs = qs
-                    strategy[s] = a
-            Vnew[s] = maxQs
-        error = errorFunc(Vnew, Vold)
-    return strategy
-
-sOpt = optimalStrategy()
+
+def successors(state, a):
+    t, v, s = state.split('/')
+    if a == 'sell':
+        sn = 'sold'
+    elif a == 'buy':
+        sn = v
+    else:
+        sn = s
+    result = []
+    for vn, p in priceMoves[v].items():
+        sNext = f"{int(t) + 1}/{vn}/{sn}"
+        result.append((sNext, p, reward(sNext, state, a)))
+    return result
+
+
+mdp = Mdp(S, possibleActions, successors, isEndState, gamma)
+
+sOpt = mdp.optimalStrategy()
 print(sOpt)
 
 # %%
-sVal = evalStrategy(sOpt)
+sVal = mdp.evalStrategy(sOpt)
 for s in sOpt:
     print(f"{s} -- {sOpt[s]} -- {sVal[s]}")
 # %%
+latestFirst = sorted(range(len(S)), key=lambda i: -int(S[i].split('/')[0]))
+for name, solve in [
+    ('synchronous', lambda: mdp.valueIteration()),
+    ('gauss-seidel', lambda: mdp.gaussSeidel()),
+    ('gauss-seidel, latest first', lambda: mdp.gaussSeidel(order=latestFirst)),
+    ('prioritized sweeping', lambda: mdp.prioritizedSweeping()),
+]:
+    solve()
+    last = mdp.stats[-1]
+    print(f"{name}: {last['backups']} backups in {len(mdp.stats)} sweeps, {last['time']:.4f}s")
+# %%
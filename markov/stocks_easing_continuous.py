@@ -1,6 +1,8 @@
 #%% 
+import numpy as np
 import scipy.stats as scs
 import numpy.random as npr
+from mdp import Mdp
 
 
 gamma = 0.95
@@ -16,11 +18,11 @@ def possibleActions(state):
 
 
 
-def sampleState():
+def sampleState(times=range(10), values=range(10, 30)):
     # should be ergodic sample
     sample = []
-    for t in range(10):
-        for v in range(10, 30): # better: sample here according to prediction
+    for t in times:
+        for v in values: # better: sample here according to prediction
             for s in ['holding', 'sold']:
                 sample.append(f"{t}/{v}/{s}")
     return sample
@@ -43,80 +45,45 @@ def reward(sNext, state, a):
     return 0
 
 
-def prob(sNext, state, a):
-    ts, vs, ss = state.split('/')
-    tn, vn, sn = sNext.split('/')
-
-    # excluding impossible combinations
-    if ss == 'sold' and sn != 'sold':
-        return 0
-    if a == 'sell' and sn != 'sold':
-        return 0
-    if int(ts) + 1 != int(tn):
-        return 0
-
-    norm = scs.norm(float(vs), 1.5)
-    return norm.pdf(float(vn))
-   
-    
-
-def differenceFunction(v1, v2):
-    e = 0
-    for key in v1:
-        e += (v1[key] - v2[key]) ** 2
-    return e
-
-
-def qValue(state, action, Vold):
-    if isEndState(state):
-        return 0
-    v = 0
-    for sNext in Vold.keys():
-        vNow = reward(sNext, state, action)
-        vFut = Vold[sNext]
-        p = prob(sNext, state, action)
-        v += p * (vNow + gamma * vFut)
-    return v
-
-
-def evalStrategy(strategy):
-    S = sampleState()
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.001:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            action = strategy[s]
-            Vnew[s] = qValue(s, action, Vold)
-        error = differenceFunction(Vnew, Vold)
-    return Vnew
-
-
-def optimalStrategy():
-    strategy = {}
-    S = sampleState()
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.05:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            maxQs = -99999
-            for a in possibleActions(s):
-                qs = qValue(s, a, Vold)
-                if qs > maxQs:
-                    maxQs = qs
-                    strategy[s] = a
-            Vnew[s] = maxQs
-        error = differenceFunction(Vnew, Vold)
-    return strategy
+priceSpread = 1.5
+priceCutoff = 4  # next prices further than `priceCutoff * priceSpread` away have a negligible probability
+priceMovesCache = {}
+
+
+def priceMoves(v):
+    """ (next price, probability density) for all integer prices around `v` """
+    if v not in priceMovesCache:
+        reach = int(priceCutoff * priceSpread)
+        vns = np.arange(v - reach, v + reach + 1)
+        ps = scs.norm.pdf(vns, v, priceSpread)
+        priceMovesCache[v] = list(zip(vns.tolist(), ps.tolist()))
+    return priceMovesCache[v]
+
+
+def successors(state, a):
+    t, v, s = state.split('/')
+    sn = 'sold' if a == 'sell' else s
+    result = []
+    for vn, p in priceMoves(int(v)):
+        sNext = f"{int(t) + 1}/{vn}/{sn}"
+        result.append((sNext, p, reward(sNext, state, a)))
+    return result
+
+
+S = sampleState()
+mdp = Mdp(S, possibleActions, successors, isEndState, gamma)
 
 # %%
-sOpt = optimalStrategy()
+sOpt = mdp.optimalStrategy()
 print(sOpt)
 
-sVal = evalStrategy(sOpt)
+sVal = mdp.evalStrategy(sOpt)
 for s in sOpt:
     print(f"{s} -- {sOpt[s]} -- {sVal[s]}")
 # %%
+# a sample of 10^5 states: successors only touch the ~13 neighbouring prices
+S = sampleState(values=range(5000))
+mdp = Mdp(S, possibleActions, successors, isEndState, gamma)
+sOpt = mdp.optimalStrategy()
+print(f"{len(S)} states, {sum(P.nnz for P in mdp.P)} transitions")
+# %%
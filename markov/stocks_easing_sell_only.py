@@ -1,4 +1,6 @@
 #%% 
+from mdp import Mdp, scan
+
 gamma = 0.95
 
 S = [  # time / stock price / ownership
@@ -133,61 +135,13 @@ def prob(sNext, state, a):
                     
     
 
-def errorFunc(v1, v2):
-    e = 0
-    for key in v1:
-        e += (v1[key] - v2[key]) ** 2
-    return e
-
+mdp = Mdp(S, possibleActions, scan(S, prob, reward), isEndState, gamma)
 
-def qValue(state, action, Vold):
-    if isEndState(state):
-        return 0
-    v = 0
-    for sNext in S:
-        vNow = reward(sNext, state, action)
-        vFut = Vold[sNext]
-        p = prob(sNext, state, action)
-        v += p * (vNow + gamma * vFut)
-    return v
-
-
-def evalStrategy(strategy):
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.001:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            action = strategy[s]
-            Vnew[s] = qValue(s, action, Vold)
-        error = errorFunc(Vnew, Vold)
-    return Vnew
-
-
-def optimalStrategy():
-    strategy = {}
-    Vnew = {s: 0 for s in S}
-    error = 99999
-    while error > 0.05:
-        Vold = Vnew
-        Vnew = {}
-        for s in S:
-            maxQs = -99999
-            for a in possibleActions(s):
-                qs = qValue(s, a, Vold)
-                if qs > maxQs:
-                    maxQs = qs
-                    strategy[s] = a
-            Vnew[s] = maxQs
-        error = errorFunc(Vnew, Vold)
-    return strategy
-
-sOpt = optimalStrategy()
+sOpt = mdp.optimalStrategy()
 print(sOpt)
 
 # %%
-sVal = evalStrategy(sOpt)
+sVal = mdp.evalStrategy(sOpt)
 for s in sOpt:
     print(f"{s} -- {sOpt[s]} -- {sVal[s]}")
 # %%
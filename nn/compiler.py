@@ -0,0 +1,276 @@
+import numpy as np
+from nodes import Node, Constant, Variable, Plus, Minus, Mult, Exp, ScalarProd, ScalarPower, Tape
+
+
+"""
+Compiles an expression built from `nodes` into a flat program.
+
+    program = compile(sse)
+    program(at)             # forward pass
+    program.gradients(at)   # dict: variable -> grad_sse_variable
+
+At compile time:
+    - nodes are sorted topologically
+    - sub-expressions without variables are folded into constants
+    - structurally identical sub-expressions are merged (common subexpression elimination)
+    - chains of elementwise nodes (like `Sigmoid` = ScalarProd -> Exp -> Plus -> ScalarPower)
+      are fused into a single step that runs numpy ufuncs into preallocated buffers
+
+All other nodes are run through their own `eval` and `grad_s_v`,
+so the compiled program computes exactly what the interpreted one does.
+"""
+
+
+class Stage:
+    """ one elementwise operation inside a fused chain """
+    def __init__(self, kind, param):
+        self.kind = kind
+        self.param = param
+
+    def forward(self, x, out):
+        if self.kind == 'scale':
+            return np.multiply(x, self.param, out=out)
+        if self.kind == 'add':
+            return np.add(x, self.param, out=out)
+        if self.kind == 'subtractFrom':
+            return np.subtract(self.param, x, out=out)
+        if self.kind == 'exp':
+            return np.exp(x, out=out)
+        if self.kind == 'power':
+            return np.power(x, self.param, out=out)
+
+    def backward(self, grad, x, out):
+        """ grad_s_x, given grad_s_out. `x` is the stage's input, `out` its output """
+        if self.kind == 'scale':
+            return grad * self.param
+        if self.kind == 'add':
+            return grad
+        if self.kind == 'subtractFrom':
+            return -grad
+        if self.kind == 'exp':
+            return grad * out
+        if self.kind == 'power':
+            return grad * self.param * np.power(x, self.param - 1)
+
+
+class Chain:
+    """ a fused sequence of elementwise stages; stage i reads slot `slots[i]` and writes slot `slots[i+1]` """
+    def __init__(self, inputSlot):
+        self.slots = [inputSlot]
+        self.stages = []
+        self.buffers = []
+
+    def append(self, stage, slot):
+        self.stages.append(stage)
+        self.slots.append(slot)
+        self.buffers.append(None)
+
+    def forward(self, values):
+        x = values[self.slots[0]]
+        for i, stage in enumerate(self.stages):
+            shape = np.shape(x)
+            if self.buffers[i] is None or self.buffers[i].shape != shape:
+                self.buffers[i] = np.empty(shape)
+            x = stage.forward(x, self.buffers[i])
+            values[self.slots[i + 1]] = x
+
+    def backward(self, values, adjoints):
+        grad = adjoints[self.slots[-1]]
+        for i in reversed(range(len(self.stages))):
+            grad = self.stages[i].backward(grad, values[self.slots[i]], values[self.slots[i + 1]])
+        return [(self.slots[0], grad)]
+
+
+class Interpreted:
+    """ a single node, run through its own `eval` and `grad_s_v` """
+    def __init__(self, op, slot, childSlots):
+        self.op = op
+        self.slot = slot
+        self.childSlots = childSlots
+
+    def forward(self, values, tape):
+        values[self.slot] = self.op.eval(tape)
+
+    def backward(self, values, adjoints, tape):
+        grad_s_op = adjoints[self.slot]
+        return [
+            (childSlot, self.op.grad_s_v(child, tape, grad_s_op))
+            for child, childSlot in zip(self.op.getVariables(), self.childSlots)
+        ]
+
+
+class SlotTape(Tape):
+    """ a tape that reads node values from the slots of a compiled program """
+    def __init__(self, at, program, values):
+        super().__init__(at)
+        self.program = program
+        self.slotValues = values
+
+    def value(self, op):
+        return self.slotValues[self.program.slotOf[op]]
+
+
+class Program:
+    def __init__(self, op):
+        self.op = op
+        self.slotOf = {}       # original node -> slot
+        self.keyToSlot = {}    # structural key -> slot
+        self.nodeOf = []       # slot -> representative node
+        self.childSlots = []   # slot -> slots of the representative's variables
+        self.isConstant = []
+        self.uses = []
+        self.variables = {}    # variable name -> slot
+        self.__canonicalize(op)
+        self.outputSlot = self.slotOf[op]
+        self.uses[self.outputSlot] += 1
+
+        self.constants = {}
+        for slot, node in enumerate(self.nodeOf):
+            if self.isConstant[slot]:
+                self.constants[slot] = Tape({}).value(node)
+
+        self.steps = []
+        chainEndingAt = {}
+        for slot, node in enumerate(self.nodeOf):
+            if self.isConstant[slot] or type(node) is Variable:
+                continue
+            fusable = self.__asStage(slot)
+            if fusable is not None:
+                stage, inputSlot = fusable
+                chain = chainEndingAt.pop(inputSlot, None)
+                if chain is None or self.uses[inputSlot] != 1:
+                    chain = Chain(inputSlot)
+                    self.steps.append(chain)
+                chain.append(stage, slot)
+                chainEndingAt[slot] = chain
+            else:
+                self.steps.append(Interpreted(node, slot, self.childSlots[slot]))
+
+    def __canonicalize(self, node):
+        if node in self.slotOf:
+            return self.slotOf[node]
+        children = node.getVariables()
+        childSlots = [self.__canonicalize(child) for child in children]
+        key = self.__key(node, childSlots)
+        if key not in self.keyToSlot:
+            slot = len(self.nodeOf)
+            self.keyToSlot[key] = slot
+            self.nodeOf.append(node)
+            self.childSlots.append(childSlots)
+            self.isConstant.append(type(node) is not Variable and all(self.isConstant[c] for c in childSlots))
+            self.uses.append(0)
+            for c in childSlots:
+                self.uses[c] += 1
+            if type(node) is Variable:
+                self.variables[node.name] = slot
+        slot = self.keyToSlot[key]
+        self.slotOf[node] = slot
+        return slot
+
+    def __key(self, node, childSlots):
+        if type(node) is Constant:
+            return ('Constant', node.value.shape, node.value.dtype.str, node.value.tobytes())
+        if type(node) is Variable:
+            return ('Variable', node.name)
+        params = tuple(sorted(
+            (name, value) for name, value in vars(node).items()
+            if not isinstance(value, Node)
+        ))
+        try:
+            hash(params)
+        except TypeError:
+            # unhashable parameters (e.g. arrays): key by identity, so this node is never merged
+            return (node.__class__.__name__, 'identity', id(node))
+        return (node.__class__.__name__, params, tuple(childSlots))
+
+    def __scalarConstant(self, slot):
+        if self.isConstant[slot] and np.shape(self.constants[slot]) == ():
+            return float(self.constants[slot])
+        return None
+
+    def __asStage(self, slot):
+        """ returns `(stage, inputSlot)` if the node at `slot` is elementwise in a single non-constant input """
+        node = self.nodeOf[slot]
+        children = self.childSlots[slot]
+        if type(node) is ScalarProd and np.ndim(node.scalar) == 0:
+            return Stage('scale', float(node.scalar)), children[0]
+        if type(node) is ScalarPower and np.ndim(node.scalar) == 0:
+            return Stage('power', float(node.scalar)), children[0]
+        if type(node) is Exp:
+            return Stage('exp', None), children[0]
+        if type(node) in (Plus, Minus, Mult):
+            a, b = children
+            cA = self.__scalarConstant(a)
+            cB = self.__scalarConstant(b)
+            if type(node) is Plus and cA is not None:
+                return Stage('add', cA), b
+            if type(node) is Plus and cB is not None:
+                return Stage('add', cB), a
+            if type(node) is Minus and cA is not None:
+                return Stage('subtractFrom', cA), b
+            if type(node) is Minus and cB is not None:
+                return Stage('add', -cB), a
+            if type(node) is Mult and cA is not None:
+                return Stage('scale', cA), b
+            if type(node) is Mult and cB is not None:
+                return Stage('scale', cB), a
+        return None
+
+    def __forward(self, at):
+        values = [None] * len(self.nodeOf)
+        for slot, value in self.constants.items():
+            values[slot] = value
+        for name, slot in self.variables.items():
+            if name in at:
+                values[slot] = at[name]
+        tape = SlotTape(at, self, values)
+        for step in self.steps:
+            if type(step) is Chain:
+                step.forward(values)
+            else:
+                step.forward(values, tape)
+        return values, tape
+
+    def __call__(self, at):
+        """ the value of the expression at `at`; a fresh array, never one of the program's buffers """
+        values, _ = self.__forward(at)
+        value = values[self.outputSlot]
+        return value.copy() if isinstance(value, np.ndarray) else value
+
+    def gradients(self, at):
+        """ one forward and one backward pass; returns `variable -> grad_op_variable` for every variable in the expression """
+        values, tape = self.__forward(at)
+        opV = values[self.outputSlot]
+        if np.shape(opV) != ():
+            raise Exception(f"Can only do gradients on scalar-valued expressions. This expression has shape {np.shape(opV)}: {opV}")
+
+        adjoints = [None] * len(self.nodeOf)
+        adjoints[self.outputSlot] = np.array(1.0)
+        for step in reversed(self.steps):
+            lastSlot = step.slots[-1] if type(step) is Chain else step.slot
+            if adjoints[lastSlot] is None:
+                continue
+            if type(step) is Chain:
+                contributions = step.backward(values, adjoints)
+            else:
+                contributions = step.backward(values, adjoints, tape)
+            for slot, grad in contributions:
+                if self.isConstant[slot]:
+                    continue
+                if adjoints[slot] is None:
+                    adjoints[slot] = grad
+                else:
+                    adjoints[slot] = adjoints[slot] + grad
+
+        grads = {}
+        for node, slot in self.slotOf.items():
+            if type(node) is Variable:
+                grads[node] = adjoints[slot] if adjoints[slot] is not None else 0
+        return grads
+
+    def gradient(self, x, at):
+        return self.gradients(at).get(x, 0)
+
+
+def compile(op):
+    return Program(op)
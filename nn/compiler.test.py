@@ -0,0 +1,71 @@
+import unittest as ut
+import numpy as np
+from nodes import Constant, Variable, Plus, MatMul, InnerSum, ScalarProd, Sigmoid, Softmax, Sse, gradients
+from compiler import compile, Chain
+
+
+class CompilerTests(ut.TestCase):
+
+    def testMatchesInterpreted(self):
+        i = Variable('i')
+        W = Variable('W')
+        b = Variable('b')
+        yObs = Variable('yObs')
+        y = Sigmoid(Plus(MatMul(W, i), b))
+        sse = Sse(yObs, Softmax(y))
+
+        at = {
+            'i': np.random.random(3),
+            'W': np.random.random([2, 3]),
+            'b': np.random.random(2),
+            'yObs': np.random.random(2)
+        }
+
+        program = compile(sse)
+        self.assertAlmostEqual(program(at), sse.eval(at))
+
+        expected = gradients(sse, at)
+        actual = program.gradients(at)
+        for v in [i, W, b, yObs]:
+            np.testing.assert_array_almost_equal(actual[v], expected[v])
+
+    def testFusesSigmoid(self):
+        x = Variable('x')
+        program = compile(Sigmoid(x))
+        self.assertEqual(len(program.steps), 1)
+        self.assertIs(type(program.steps[0]), Chain)
+        self.assertEqual(len(program.steps[0].stages), 4)
+
+        xVal = np.array([-1.0, 0.0, 2.0])
+        np.testing.assert_array_almost_equal(program({'x': xVal}), 1.0 / (1.0 + np.exp(-xVal)))
+
+    def testFoldsConstantsAndMergesCommonSubexpressions(self):
+        x = Variable('x')
+        c = Plus(Constant(1.0), Constant(2.0))
+        s = InnerSum(Plus(ScalarProd(2, Plus(x, c)), ScalarProd(2, Plus(x, c))))
+        program = compile(s)
+
+        # one fused chain for 2 * (x + 3), the outer plus and the sum
+        self.assertEqual(len(program.steps), 3)
+        xVal = np.array([1.0, 2.0])
+        self.assertAlmostEqual(program({'x': xVal}), s.eval({'x': xVal}))
+        np.testing.assert_array_almost_equal(program.gradient(x, {'x': xVal}), np.array([4.0, 4.0]))
+
+    def testResultsAreNotOverwrittenByLaterCalls(self):
+        x = Variable('x')
+        program = compile(Sigmoid(x))
+        a = program({'x': np.array([0.0, 1.0])})
+        aBefore = a.copy()
+        program({'x': np.array([5.0, 5.0])})
+        np.testing.assert_array_equal(a, aBefore)
+
+    def testArrayValuedParameters(self):
+        x = Variable('x')
+        s = InnerSum(Plus(ScalarProd(np.array([1.0, 2.0]), x), ScalarProd(np.array([1.0, 2.0]), x)))
+        program = compile(s)
+        xVal = np.array([3.0, 4.0])
+        self.assertAlmostEqual(program({'x': xVal}), s.eval({'x': xVal}))
+
+
+if __name__ == '__main__':
+    ut.main()
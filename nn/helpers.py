@@ -1,4 +1,6 @@
 import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
 
 def allEqual(data):
     for entry in data:
@@ -63,6 +65,21 @@ def matMul(A, B, nrDims=None):
     return np.tensordot(A, B, axes=(axesA, axesB))
 
 
+def unbroadcast(grad, shape):
+    """
+        sums `grad` over the axes that numpy broadcast
+        when an operand of shape `shape` took part in an elementwise operation
+    """
+    if grad.shape == shape:
+        return grad
+    while len(grad.shape) > len(shape):
+        grad = np.sum(grad, axis=0)
+    for axis, size in enumerate(shape):
+        if size == 1 and grad.shape[axis] != 1:
+            grad = np.sum(grad, axis=axis, keepdims=True)
+    return grad
+
+
 def crossMult(A, B):
     if A.shape[-1] != 1:
         A = np.reshape(A, A.shape + (1,))
@@ -92,11 +109,98 @@ def diffBySelf(shape):
     return out
 
 
-def memoized(func):
-    memory = {}
+class LruCache:
+    """
+        Bounded memo-store with least-recently-used eviction.
+        Counts hits, misses and evictions, so that `maxSize` can be tuned.
+    """
+    def __init__(self, maxSize=1024):
+        self.maxSize = maxSize
+        self.memory = OrderedDict()
+        self.scopes = []   # per open `scope`: the keys added within it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, compute):
+        if key in self.memory:
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        self.misses += 1
+        value = compute()
+        self.memory[key] = value
+        if self.scopes:
+            self.scopes[-1].add(key)
+        if self.maxSize is not None:
+            while len(self.memory) > self.maxSize:
+                self.memory.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        self.memory.clear()
+
+    @contextmanager
+    def scope(self):
+        """ entries added within the `with` block are forgotten when leaving it; older entries are kept """
+        self.scopes.append(set())
+        try:
+            yield self
+        finally:
+            for key in self.scopes.pop():
+                self.memory.pop(key, None)
+
+    def stats(self):
+        return {
+            "size": len(self.memory),
+            "maxSize": self.maxSize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class Identity:
+    """ a hashable stand-in for `obj` that compares by identity and keeps `obj` alive, so its id cannot be recycled """
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return type(other) is Identity and other.obj is self.obj
+
+
+def memoKey(arg):
+    """
+        Cheap, hashable key for memoization.
+        Arrays and other unhashable objects are keyed by identity, so changing an array in place does not
+        invalidate its entries: memoize across such changes only within a `LruCache.scope`.
+    """
+    if type(arg) is np.ndarray:
+        return Identity(arg)
+    if type(arg) is dict:
+        return tuple((k, memoKey(v)) for k, v in arg.items())
+    if type(arg) in (list, tuple):
+        return tuple(memoKey(a) for a in arg)
+    if arg.__hash__ is None:
+        return Identity(arg)
+    return arg
+
+
+def memoized(func=None, maxSize=1024):
+    """
+        Use either as `@memoized` or as `@memoized(maxSize=...)`.
+        The cache is exposed as `memF.cache`.
+    """
+    if func is None:
+        return lambda f: memoized(f, maxSize)
+    cache = LruCache(maxSize)
     def memF(*args):
-        argString = f"{args}"
-        if argString not in memory:
-            memory[argString] = func(*args)
-        return memory[argString]
-    return memF
\ No newline at end of file
+        return cache.get(memoKey(args), lambda: func(*args))
+    memF.cache = cache
+    return memF
@@ -0,0 +1,73 @@
+import unittest as ut
+import numpy as np
+from helpers import memoized
+
+
+class HelperTests(ut.TestCase):
+
+    def testMemoizedBounded(self):
+        calls = []
+
+        @memoized(maxSize=2)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        square(1)
+        square(2)
+        square(1)
+        square(3)  # evicts 2, the least recently used
+        square(1)
+        square(2)
+        self.assertEqual(calls, [1, 2, 3, 2])
+        stats = square.cache.stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["evictions"], 2)
+
+    def testMemoizedArraysByIdentity(self):
+        @memoized
+        def total(arr):
+            return np.sum(arr)
+
+        arr = np.array([1.0, 2.0])
+        self.assertEqual(total(arr), 3.0)
+        self.assertEqual(total(arr), 3.0)
+        self.assertEqual(total(np.array([1.0, 2.0])), 3.0)
+        self.assertEqual(total.cache.hits, 1)
+        self.assertEqual(total.cache.misses, 2)
+
+    def testMemoizedUnhashableByIdentity(self):
+        @memoized
+        def length(items):
+            return len(items)
+
+        class Bag:
+            __hash__ = None
+            def __init__(self, n):
+                self.n = n
+            def __len__(self):
+                return self.n
+
+        for n in range(100):
+            self.assertEqual(length(Bag(n)), n)
+        self.assertEqual(length.cache.hits, 0)
+
+    def testMemoizedScope(self):
+        @memoized
+        def double(x):
+            return 2 * x
+
+        double(0)
+        with double.cache.scope():
+            double(1)
+            double(1)
+            self.assertEqual(double.cache.stats()["size"], 2)
+        self.assertEqual(double.cache.stats()["size"], 1)
+        double(0)
+        self.assertEqual(double.cache.hits, 2)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -1,4 +1,6 @@
-from nodes import Node, Constant, Plus, Sse, Variable, MatMul, Transpose, Softmax, Sigmoid, gradient
+from nodes import Node, Constant, Plus, Sse, Variable, MatMul, Transpose, Softmax, Sigmoid, gradients
+from compiler import compile
+from optimizers import Sgd
 import numpy as np
 
 
@@ -28,7 +30,7 @@ class Layer:
         return self.output
     def getParaValues(self):
         pass
-    def update(self, error, at):
+    def update(self, error, at, optimizer=None):
         pass
 
 
@@ -41,6 +43,7 @@ class FullyConnectedLayer(Layer):
         self.W = Variable(f"{self.name}-W")
         self.b = Variable(f"{self.name}-b")
         self.output = Sigmoid(Plus(MatMul(self.W, self.input), self.b))
+        self.optimizer = Sgd()
 
     def getParaValues(self):
         return {
@@ -48,11 +51,11 @@ class FullyConnectedLayer(Layer):
             self.b.name: self.bVal
         }
 
-    def update(self, error, at):
-        dedW = gradient(error, self.W, at)
-        self.WVal += 0.01 * dedW
-        dedb = gradient(error, self.b, at)
-        self.bVal += 0.01 * dedb
+    def update(self, error, at, optimizer=None):
+        """ one step of `optimizer` against `error`; by default of the layer's own `Sgd`, whose state is kept between steps """
+        optimizer = optimizer or self.optimizer
+        grads = gradients(error, at)
+        optimizer.step(self.getParaValues(), {self.W.name: grads[self.W], self.b.name: grads[self.b]})
 
 
 class SelfAttentionLayer(Layer):
@@ -87,5 +90,59 @@ class SelfAttentionLayer(Layer):
     def getParaValues(self):
         return {}
     
-    def update(self, error, at):
-        return
\ No newline at end of file
+    def update(self, error, at, optimizer=None):
+        return
+
+class Trainer:
+    """
+        Trains all parameters of `layers` against the scalar expression `error`.
+        `error` is compiled once; every sample then needs one forward and one backward pass
+        to get the gradients of all parameters at once.
+        Gradients are averaged over a batch into reused buffers and handed to `optimizer`,
+        which updates the layers' parameter-arrays in place.
+    """
+    def __init__(self, error, layers, optimizer):
+        self.program = compile(error)
+        self.optimizer = optimizer
+        self.params = {}
+        for layer in layers:
+            self.params.update(layer.getParaValues())
+        self.grads = {name: np.zeros(np.shape(value)) for name, value in self.params.items()}
+
+    def trainBatch(self, samples):
+        """ `samples`: list of bindings for the non-parameter variables, e.g. `{'input': ..., 'observation': ...}` """
+        for grad in self.grads.values():
+            grad.fill(0.0)
+        for sample in samples:
+            at = dict(sample)
+            at.update(self.params)
+            for node, grad in self.program.gradients(at).items():
+                if node.name in self.grads:
+                    self.grads[node.name] += grad
+        for grad in self.grads.values():
+            grad /= len(samples)
+        self.optimizer.step(self.params, self.grads)
+
+    def fit(self, batches):
+        """ `batches`: any iterable (e.g. a generator) of lists of samples. Returns the number of steps taken. """
+        steps = 0
+        for samples in batches:
+            self.trainBatch(samples)
+            steps += 1
+        return steps
+
+    def error(self, samples):
+        total = 0.0
+        for sample in samples:
+            at = dict(sample)
+            at.update(self.params)
+            total += self.program(at)
+        return total / len(samples)
+
+
+def minibatches(samples, batchSize, nrEpochs=1):
+    """ generator: shuffles `samples` every epoch and yields them in lists of `batchSize` """
+    for epoch in range(nrEpochs):
+        order = np.random.permutation(len(samples))
+        for start in range(0, len(samples), batchSize):
+            yield [samples[i] for i in order[start:start + batchSize]]
@@ -1,7 +1,8 @@
 import unittest as ut
 import numpy as np
 from nodes import Variable, MatMul, Plus, Transpose, Sigmoid, Softmax, Sse, gradient
-from nn import FullyConnectedLayer, SelfAttentionLayer
+from nn import FullyConnectedLayer, SelfAttentionLayer, Trainer, minibatches
+from optimizers import Sgd, Adam, RmsProp
 
 
 class NnTests(ut.TestCase):
@@ -41,10 +42,10 @@ class NnTests(ut.TestCase):
             dedb2 = gradient(e, x2, values)
             dedW1 = gradient(e, W1, values)
             dedb1 = gradient(e, x1, values)
-            values['W2'] += alpha * dedW2
-            values['b2'] += alpha * dedb2
-            values['W1'] += alpha * dedW1
-            values['b1'] += alpha * dedb1
+            values['W2'] -= alpha * dedW2
+            values['b2'] -= alpha * dedb2
+            values['W1'] -= alpha * dedW1
+            values['b1'] -= alpha * dedb1
 
             ei = e.eval(values)
             print(f"{round(100 * i/N)}% - {ei}")
@@ -124,6 +125,58 @@ class NnTests(ut.TestCase):
         self.assertLess(eFinal, eInitial)
 
 
+    def testUpdateWithOptimizer(self):
+        input = Variable('input')
+        observation = Variable('observation')
+        layer = FullyConnectedLayer("layer", 3, 2, input)
+        err = Sse(observation, layer.getOutput())
+        at = {'input': np.random.random(3), 'observation': np.random.random(2)}
+        at.update(layer.getParaValues())
+        W = layer.WVal
+
+        eInitial = err.eval(at)
+        optimizer = Adam(0.05)
+        for _ in range(20):
+            layer.update(err, at, optimizer)
+        self.assertIs(layer.WVal, W)
+        self.assertLess(err.eval(at), eInitial)
+
+    def testDefaultOptimizerKeepsState(self):
+        input = Variable('input')
+        observation = Variable('observation')
+        layer = FullyConnectedLayer("layer", 3, 2, input)
+        layer.optimizer.momentum = 0.9
+        err = Sse(observation, layer.getOutput())
+        at = {'input': np.random.random(3), 'observation': np.random.random(2)}
+        at.update(layer.getParaValues())
+
+        layer.update(err, at)
+        velocity = layer.optimizer.velocities[layer.W.name]
+        layer.update(err, at)
+        self.assertIs(layer.optimizer.velocities[layer.W.name], velocity)
+
+    def testTrainer(self):
+        samples = [
+            { 'input': np.random.random(4), 'observation': np.random.random(2) }
+            for _ in range(20)
+        ]
+
+        for optimizer in [Sgd(0.1, momentum=0.9), Adam(0.01), RmsProp(0.01)]:
+            observation = Variable("observation")
+            input = Variable("input")
+            layer1 = FullyConnectedLayer("layer1", 4, 3, input)
+            layer2 = FullyConnectedLayer("layer2", 3, 2, layer1.getOutput())
+            err = Sse(observation, layer2.getOutput())
+
+            trainer = Trainer(err, [layer1, layer2], optimizer)
+            W1 = layer1.WVal
+            eInitial = trainer.error(samples)
+            steps = trainer.fit(minibatches(samples, 5, nrEpochs=10))
+            eFinal = trainer.error(samples)
+
+            self.assertEqual(steps, 40)
+            self.assertIs(layer1.WVal, W1)
+            self.assertLess(eFinal, eInitial)
 
 
 
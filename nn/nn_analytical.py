@@ -33,72 +33,84 @@ def diffSigmoid(x):
     return sigmoid(x) * (1 - sigmoid(x))
 
 
+def sigmoidInto(x, out):
+    np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1.0
+    np.reciprocal(out, out=out)
+    return out
+
+def reuse(buffer, shape):
+    if buffer is None or buffer.shape != shape:
+        return np.empty(shape)
+    return buffer
+
+
 class FullyConnectedOutputLayer:
+    """
+        Works on whole batches: inputs have shape (batch, inSize), outputs (batch, outSize).
+        Activations and gradients are written into buffers that are reused as long as the batch-size stays the same,
+        so the arrays returned by `forward` and `backward` are overwritten by the next call.
+    """
     def __init__(self, inSize, outSize):
         self.weights = np.random.randn(outSize, inSize) * np.sqrt(2. / (outSize + inSize))
+        self.x = None
+        self.y = None
+        self.dEdx = None
+        self.dEdW = np.zeros(self.weights.shape)
 
     def forward(self, inputs):
-        out = []
-        for input in inputs:
-            x = self.weights @ input
-            y = sigmoid(x)
-            out.append(y)
-        return out
+        inputs = np.asarray(inputs, dtype=float)
+        self.x = reuse(self.x, (inputs.shape[0], self.weights.shape[0]))
+        self.y = reuse(self.y, self.x.shape)
+        np.matmul(inputs, self.weights.T, out=self.x)
+        return sigmoidInto(self.x, self.y)
     
     def backward(self, trueValues, predictions, inputs):
+        trueValues = np.asarray(trueValues, dtype=float)
+        predictions = np.asarray(predictions, dtype=float)
+        inputs = np.asarray(inputs, dtype=float)
 
-        dEdx = []
-        dEdW = np.zeros(self.weights.shape)
-
-        batchSize = len(trueValues)
-        for s in range(batchSize):
+        # diffSigmoid(x) = y * (1 - y), with y = sigmoid(x) = predictions
+        self.dEdx = reuse(self.dEdx, predictions.shape)
+        np.subtract(trueValues, predictions, out=self.dEdx)
+        self.dEdx *= 2 * predictions * (1 - predictions)
 
-            input_s = inputs[s]
-            prediction_s = predictions[s]
-            trueValue_s = trueValues[s]
-
-            x_s = self.weights @ input_s
-            dSig_s = diffSigmoid(x_s)
-            dEdx_s = 2 * (trueValue_s - prediction_s) * dSig_s
-            
-            dEdx.append(dEdx_s)
-            dEdW += np.outer(dEdx_s, input_s)
-        
-        return dEdx, dEdW
+        np.matmul(self.dEdx.T, inputs, out=self.dEdW)
+        return self.dEdx, self.dEdW
 
         
 
 class FullyConnectedLayer:
+    """
+        Works on whole batches: inputs have shape (batch, inSize), outputs (batch, outSize).
+        Activations and gradients are written into buffers that are reused as long as the batch-size stays the same,
+        so the arrays returned by `forward` and `backward` are overwritten by the next call.
+    """
     def __init__(self, inSize, outSize):
         self.weights = np.random.randn(outSize, inSize) * np.sqrt(2. / (outSize + inSize))
+        self.x = None
+        self.y = None
+        self.dEdx = None
+        self.dEdW = np.zeros(self.weights.shape)
 
     def forward(self, inputs):
-        out = []
-        for input in inputs:
-            x = self.weights @ input
-            y = sigmoid(x)
-            out.append(y)
-        return out
+        inputs = np.asarray(inputs, dtype=float)
+        self.x = reuse(self.x, (inputs.shape[0], self.weights.shape[0]))
+        self.y = reuse(self.y, self.x.shape)
+        np.matmul(inputs, self.weights.T, out=self.x)
+        return sigmoidInto(self.x, self.y)
     
     def backward(self, dEdx_lp1, W_lp1, inputs):
+        inputs = np.asarray(inputs, dtype=float)
 
-        dEdx = []
-        dEdW = np.zeros(self.weights.shape)
-
-        batchSize = len(dEdx_lp1)
-        for s in range(batchSize):
-
-            dEdx_lp1_s = dEdx_lp1[s]
-            input_s = inputs[s]
-
-            x_s = self.weights @ input_s
-            dSig_s = diffSigmoid(x_s)
-            dEdx_l_s = (dEdx_lp1_s @ W_lp1) * dSig_s
-
-            dEdx.append(dEdx_l_s)
-            dEdW += np.outer(dEdx_l_s, input_s)
+        # diffSigmoid(x) = y * (1 - y), with y = sigmoid(x) from the last forward pass
+        self.dEdx = reuse(self.dEdx, self.y.shape)
+        np.matmul(dEdx_lp1, W_lp1, out=self.dEdx)
+        self.dEdx *= self.y * (1 - self.y)
 
-        return dEdx, dEdW
+        np.matmul(self.dEdx.T, inputs, out=self.dEdW)
+        return self.dEdx, self.dEdW
 
 
 
@@ -146,7 +158,8 @@ class Network:
 
         # 3. update
         for l, layer in enumerate(self.layers):
-            layer.weights += alpha * allDEdWs[l]
+            allDEdWs[l] *= alpha
+            layer.weights += allDEdWs[l]
 
 
         
@@ -195,10 +208,12 @@ print("prediction before training: ", predictionError(predictions1, validationTr
 
 
 # training
+dataInputs     = np.array([d["input"]  for d in data], dtype=float)
+dataTrueValues = np.array([d["output"] for d in data], dtype=float)
 for i in range(nrIterations):
     batchIndices = pick_random_numbers(batchSize, len(data))
-    inputs     = [d["input"]  for d in pick(data, batchIndices)]
-    trueValues = [d["output"] for d in pick(data, batchIndices)]
+    inputs     = dataInputs[batchIndices]
+    trueValues = dataTrueValues[batchIndices]
     net.trainBatch(inputs, trueValues, 0.1 * (1. - i/nrIterations))
     if i % 1_000 == 0:
         prediction = net.predict(validationInputs)[-1]
@@ -1,5 +1,5 @@
 import numpy as np
-from helpers import eye, matMul, memoized
+from helpers import eye, matMul, memoized, unbroadcast
 
 
 class Node():
@@ -109,10 +109,16 @@ class Mult(Node):
         return eval(self.a, at) * eval(self.b, at)
     
     def grad_s_v(self, v, at, grad_s_node):
+        """
+            elementwise: grad_node_v is diagonal,
+            so grad_s_node @ grad_node_v is just a (broadcast) elementwise product
+        """
         if v == self.a:
-            return matMul(grad_s_node, eval(self.b, at), 1)
+            aV = eval(self.a, at)
+            return unbroadcast(grad_s_node * eval(self.b, at), np.shape(aV))
         if v == self.b:
-            return matMul(grad_s_node, eval(self.a, at), 1)
+            bV = eval(self.b, at)
+            return unbroadcast(grad_s_node * eval(self.a, at), np.shape(bV))
         
     def getVariables(self):
         return [self.a, self.b]
@@ -131,9 +137,8 @@ class Exp(Node):
     
     def grad_s_v(self, v, at, grad_s_node):
         if v == self.a:
-            aV = eval(self.a, at)
-            grad_node_v = np.eye(len(aV) if aV.shape else 1) * (aV * np.exp(aV))
-            return matMul(grad_s_node, grad_node_v, 1)
+            # elementwise: multiply by the diagonal of grad_node_v instead of building it
+            return grad_s_node * eval(self, at)
 
     def getVariables(self):
         return [self.a]
@@ -252,9 +257,9 @@ class ScalarPower(Node):
     def grad_s_v(self, v, at, grad_s_node):
         if v == self.a:
             aVal =  eval(self.a, at)
+            # elementwise: multiply by the diagonal of grad_node_v instead of building it
             singleValues = self.scalar * np.power(aVal, self.scalar - 1)
-            grad_node_x = np.eye(len(singleValues)) * singleValues
-            return grad_s_node @ grad_node_x
+            return grad_s_node * singleValues
 
     def getVariables(self):
         return [self.a]
@@ -310,32 +315,69 @@ def Sse(observation, simulation):
     return sse
 
 
-@memoized
-def eval(op, at):
+class Tape(dict):
+    """
+        A binding of variable-names to values (just like `at`),
+        which additionally records every node evaluated under it.
+        Values are keyed by node identity, so that each node
+        is evaluated only once per tape.
+        `order` lists the recorded nodes such that every node
+        comes after all of its variables (i.e. in topological order).
+    """
+    def __init__(self, at):
+        super().__init__(at)
+        self.values = {}
+        self.order = []
+
+    def value(self, op):
+        if op not in self.values:
+            self.values[op] = op.eval(self)
+            self.order.append(op)
+        return self.values[op]
+
+
+@memoized(maxSize=4096)
+def evalMemoized(op, at):
     return op.eval(at)
 
 
-@memoized
-def grad_s_x_through_op(op, x, at, grad_s_op):
-    if op == x:
-        return grad_s_op
-    grad_s_x_total = 0
-    for v in op.getVariables():
-        grad_s_v = op.grad_s_v(v, at, grad_s_op)
-        if (type(v) is not Constant) and (grad_s_v.shape != eval(v, at).shape):
-            grad_s_v = op.grad_s_v(v, at, grad_s_op)
-            raise Exception(f"Something went wrong with {op.__class__.__name__}. grad_s_v must have shape {eval(v, at).shape} but has shape {grad_s_v.shape}.")
-        grad_s_x_total += grad_s_x_through_op(v, x, at, grad_s_v)
-    return grad_s_x_total
-
-
-
-def gradient(op, x, at):
-    opV = eval(op, at)
+def eval(op, at):
+    if isinstance(at, Tape):
+        return at.value(op)
+    if evalMemoized.cache.scopes:
+        return evalMemoized(op, at)
+    # outermost call: results are shared only within this evaluation, since the arrays in `at` may change in place afterwards
+    with evalMemoized.cache.scope():
+        return evalMemoized(op, at)
+
+
+def gradients(op, at):
+    """
+        Reverse-mode differentiation:
+        records one forward tape for `at`, then does one backward sweep over it.
+        Returns a dict `node -> grad_op_node` for every node that `op` depends on.
+    """
+    tape = at if isinstance(at, Tape) else Tape(at)
+    opV = tape.value(op)
     if opV.shape != ():
         raise Exception(f"Can only do gradients on scalar-valued expressions. This expression has shape {opV.shape}: {opV}")
-    grad_op_x_Val = grad_s_x_through_op(op, x, at, np.array(1.0))
-    return grad_op_x_Val
 
+    adjoints = {op: np.array(1.0)}
+    for node in reversed(tape.order):
+        if node not in adjoints:
+            continue
+        grad_s_node = adjoints[node]
+        for v in node.getVariables():
+            grad_s_v = node.grad_s_v(v, tape, grad_s_node)
+            if (type(v) is not Constant) and (grad_s_v.shape != tape.value(v).shape):
+                raise Exception(f"Something went wrong with {node.__class__.__name__}. grad_s_v must have shape {tape.value(v).shape} but has shape {grad_s_v.shape}.")
+            if v in adjoints:
+                adjoints[v] = adjoints[v] + grad_s_v
+            else:
+                adjoints[v] = grad_s_v
+    return adjoints
 
 
+def gradient(op, x, at):
+    grads = gradients(op, at)
+    return grads.get(x, 0)
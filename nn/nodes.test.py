@@ -1,5 +1,5 @@
 import unittest as ut
-from nodes import Constant, Variable, Plus, Sse, MatMul, Sigmoid, InnerSum, gradient
+from nodes import Constant, Variable, Plus, ScalarProd, Sse, MatMul, Sigmoid, InnerSum, gradient, gradients
 import numpy as np
 
 
@@ -83,8 +83,52 @@ class NodeTests(ut.TestCase):
         grad_e_W = gradient(sse, W, at)
         self.assertEqual(grad_e_W.shape, WTrue.shape)
 
+    def testGradientsOneSweep(self):
+        xVal = np.array([1.0, 2.0, 3.0])
+        WVal = np.array([[1.0, 0.0, 2.0], [2.0, 1.0, 0.0]])
+
+        x = Variable('x')
+        W = Variable('W')
+        y = MatMul(W, x)
+        s = InnerSum(y)
+
+        at = { 'x': xVal, 'W': WVal }
+        grads = gradients(s, at)
+        np.testing.assert_array_almost_equal(grads[x], np.array([3.0, 1.0, 2.0]))
+        np.testing.assert_array_almost_equal(grads[W], np.array([xVal, xVal]))
+        np.testing.assert_array_almost_equal(grads[y], np.array([1.0, 1.0]))
+
+    def testGradientsSharedNode(self):
+        x = Variable('x')
+        y = Plus(x, x)
+        s = InnerSum(Plus(ScalarProd(2, y), x))
+
+        at = { 'x': np.array([1.0, 2.0]) }
+        grads = gradients(s, at)
+        # s = sum(5x) => ds/dx = 5
+        np.testing.assert_array_almost_equal(grads[x], np.array([5.0, 5.0]))
+
     
 
 
+    def testElementwiseGradientsMatchFiniteDifferences(self):
+        i = Variable('i')
+        W = Variable('W')
+        yObs = Variable('yObs')
+        sse = Sse(yObs, Sigmoid(MatMul(W, i)))
+
+        at = { 'i': np.array([0.3, 0.1, 0.5]), 'W': np.array([[0.2, 0.4, 0.1], [0.5, 0.3, 0.7]]), 'yObs': np.array([0.2, 0.9]) }
+        grad_e_W = gradient(sse, W, at)
+
+        h = 1e-6
+        numeric = np.zeros(at['W'].shape)
+        for r in range(2):
+            for c in range(3):
+                WPlus = at['W'].copy()
+                WPlus[r, c] += h
+                numeric[r, c] = (sse.eval({**at, 'W': WPlus}) - sse.eval(at)) / h
+        np.testing.assert_array_almost_equal(grad_e_W, numeric, decimal=5)
+
+
 if __name__ == '__main__':
     ut.main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+"""
+Optimizers update parameter-arrays in place.
+`params` and `grads` are dicts from parameter-name to array (as returned by `Layer.getParaValues`).
+State and scratch buffers are allocated on the first step for each parameter and reused afterwards,
+so a step allocates no new arrays.
+"""
+
+
+class Optimizer:
+    def step(self, params, grads):
+        for name, param in params.items():
+            if name in grads:
+                self.update(name, param, grads[name])
+
+    def update(self, name, param, grad):
+        pass
+
+    def buffer(self, store, name, like):
+        if name not in store:
+            store[name] = np.zeros(like.shape)
+        return store[name]
+
+
+class Sgd(Optimizer):
+    def __init__(self, learningRate=0.01, momentum=0.0):
+        self.learningRate = learningRate
+        self.momentum = momentum
+        self.velocities = {}
+        self.scratch = {}
+
+    def update(self, name, param, grad):
+        v = self.buffer(self.velocities, name, param)
+        s = self.buffer(self.scratch, name, param)
+        # v = momentum * v - learningRate * grad
+        np.multiply(v, self.momentum, out=v)
+        np.multiply(grad, self.learningRate, out=s)
+        np.subtract(v, s, out=v)
+        param += v
+
+
+class RmsProp(Optimizer):
+    def __init__(self, learningRate=0.001, rho=0.9, epsilon=1e-8):
+        self.learningRate = learningRate
+        self.rho = rho
+        self.epsilon = epsilon
+        self.squares = {}
+        self.scratch = {}
+
+    def update(self, name, param, grad):
+        sq = self.buffer(self.squares, name, param)
+        s = self.buffer(self.scratch, name, param)
+        # sq = rho * sq + (1 - rho) * grad^2
+        np.multiply(grad, grad, out=s)
+        np.multiply(s, 1.0 - self.rho, out=s)
+        np.multiply(sq, self.rho, out=sq)
+        np.add(sq, s, out=sq)
+        # param -= learningRate * grad / (sqrt(sq) + epsilon)
+        np.sqrt(sq, out=s)
+        np.add(s, self.epsilon, out=s)
+        np.divide(grad, s, out=s)
+        np.multiply(s, self.learningRate, out=s)
+        param -= s
+
+
+class Adam(Optimizer):
+    def __init__(self, learningRate=0.001, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        self.learningRate = learningRate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.t = 0
+        self.means = {}
+        self.squares = {}
+        self.scratch = {}
+
+    def step(self, params, grads):
+        self.t += 1
+        super().step(params, grads)
+
+    def update(self, name, param, grad):
+        m = self.buffer(self.means, name, param)
+        sq = self.buffer(self.squares, name, param)
+        s = self.buffer(self.scratch, name, param)
+        # m = beta1 * m + (1 - beta1) * grad
+        np.multiply(m, self.beta1, out=m)
+        np.multiply(grad, 1.0 - self.beta1, out=s)
+        np.add(m, s, out=m)
+        # sq = beta2 * sq + (1 - beta2) * grad^2
+        np.multiply(sq, self.beta2, out=sq)
+        np.multiply(grad, grad, out=s)
+        np.multiply(s, 1.0 - self.beta2, out=s)
+        np.add(sq, s, out=sq)
+        # param -= learningRate * mHat / (sqrt(sqHat) + epsilon)
+        mCorrection = 1.0 - self.beta1 ** self.t
+        sqCorrection = 1.0 - self.beta2 ** self.t
+        np.divide(sq, sqCorrection, out=s)
+        np.sqrt(s, out=s)
+        np.add(s, self.epsilon, out=s)
+        np.divide(m, s, out=s)
+        np.multiply(s, self.learningRate / mCorrection, out=s)
+        param -= s
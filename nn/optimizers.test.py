@@ -0,0 +1,24 @@
+import unittest as ut
+import numpy as np
+from optimizers import Sgd, Adam, RmsProp
+
+
+class OptimizerTests(ut.TestCase):
+
+    def testMinimizesQuadratic(self):
+        for optimizer in [Sgd(0.1), Sgd(0.05, momentum=0.9), Adam(0.1), RmsProp(0.05)]:
+            x = np.array([3.0, -2.0])
+            params = { 'x': x }
+            for _ in range(500):
+                optimizer.step(params, { 'x': 2 * x })
+            self.assertIs(params['x'], x)
+            np.testing.assert_array_almost_equal(x, np.zeros(2), decimal=1)
+
+    def testSgdStep(self):
+        x = np.array([1.0, 2.0])
+        Sgd(0.5).step({ 'x': x }, { 'x': np.array([1.0, -1.0]) })
+        np.testing.assert_array_almost_equal(x, np.array([0.5, 2.5]))
+
+
+if __name__ == '__main__':
+    ut.main()
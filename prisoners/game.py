@@ -9,6 +9,10 @@ class Player:
     def pickAction(self):
         raise Exception('Not implemented!')
 
+    def policy(self):
+        """ this player's strategy as a `Policy`, for `prisoners.tournament` """
+        raise Exception('Not implemented!')
+
     def getSentence(self, sentence):
         self.allSentences += sentence
 
@@ -16,6 +20,27 @@ class Player:
         return self.name
 
 
+class Policy:
+    """
+        A strategy as a finite-state machine. Actions are 0 (cooperation) and 1 (treason).
+        In state `s` the player cooperates with probability `cooperate[s]`.
+        After a round where it played `a` and its opponent `b`, it moves on to state `next[s][a][b]`.
+        The first round is played in state `start`.
+    """
+    def __init__(self, cooperate, next, start = 0):
+        self.cooperate = cooperate
+        self.next = next
+        self.start = start
+
+    def deterministic(self):
+        return all(p == 0 or p == 1 for p in self.cooperate)
+
+    def key(self):
+        return (tuple(self.cooperate), tuple(tuple(tuple(row) for row in table) for table in self.next), self.start)
+
+
+ACTIONS = ['cooperation', 'treason']
+
 NR_ROUNDS = 100
 SENTENCE_VICTIM_OF_RATTING_OUT = 10
 SENTENCE_BOTH_RATTED_OUT = 8
@@ -30,12 +55,12 @@ def getRanking(players):
     return zip(sentences, players)
 
 
-def roundRobin(player, *opponents):
-    print(f"********* {player} now faces {len(opponents)} opponents ************")
-    for opponent in opponents:
-        playGame(player, opponent)
-    if len(opponents) > 1:
-        roundRobin(*opponents)
+def roundRobin(*players):
+    for i, player in enumerate(players[:-1]):
+        opponents = players[i+1:]
+        print(f"********* {player} now faces {len(opponents)} opponents ************")
+        for opponent in opponents:
+            playGame(player, opponent)
 
 
 def playGame(player1, player2):
@@ -1,4 +1,5 @@
-from prisoners.game import roundRobin, getRanking
+from prisoners.game import getRanking
+from prisoners.tournament import tournament
 import numpy as np
 
 
@@ -22,7 +23,7 @@ def drawNewGeneration(population):
 
 def playForNGenerations(population, nrGenerations):
     for _ in range(nrGenerations):
-        roundRobin(*population)
+        tournament(population)
         ranking = getRanking(population)
         for rating, player in ranking:
             print(f"sentence: {rating} --- player: {player}")
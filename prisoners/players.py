@@ -1,4 +1,4 @@
-from prisoners.game import Player, SENTENCE_BOTH_KEPT_QUIET, SENTENCE_BOTH_RATTED_OUT, SENTENCE_SUCCESSFULL_RATTING, SENTENCE_VICTIM_OF_RATTING_OUT
+from prisoners.game import Player, Policy, SENTENCE_BOTH_KEPT_QUIET, SENTENCE_BOTH_RATTED_OUT, SENTENCE_SUCCESSFULL_RATTING, SENTENCE_VICTIM_OF_RATTING_OUT
 import numpy as np
 
 
@@ -10,6 +10,9 @@ class Jesus(Player):
     def pickAction(self):
         return 'cooperation'
 
+    def policy(self):
+        return Policy([1], [[[0, 0], [0, 0]]])
+
 
 class Satan(Player):
     def __init__(self):
@@ -18,6 +21,9 @@ class Satan(Player):
     def pickAction(self):
         return 'treason'
 
+    def policy(self):
+        return Policy([0], [[[0, 0], [0, 0]]])
+
 
 class NiceTitForTat(Player):
     def __init__(self):
@@ -39,6 +45,10 @@ class NiceTitForTat(Player):
     def newMatch(self):
         self.lastSentence = None
 
+    def policy(self):
+        # state: what the opponent did last
+        return Policy([1, 0], [[[0, 1], [0, 1]], [[0, 1], [0, 1]]], start = 0)
+
 
 class MeanTitForTat(Player):
     def __init__(self):
@@ -60,6 +70,10 @@ class MeanTitForTat(Player):
     def newMatch(self):
         self.lastSentence = None
 
+    def policy(self):
+        # state: what the opponent did last
+        return Policy([1, 0], [[[0, 1], [0, 1]], [[0, 1], [0, 1]]], start = 1)
+
 class ForgivingTitForTat(Player):
     def __init__(self, chanceOfForgiving):
         super().__init__('ForgivingTitForTat')
@@ -85,6 +99,10 @@ class ForgivingTitForTat(Player):
     def newMatch(self):
         self.lastSentence = None
 
+    def policy(self):
+        # state: what the opponent did last
+        return Policy([1, self.chanceOfForgiving], [[[0, 1], [0, 1]], [[0, 1], [0, 1]]], start = 0)
+
 
 class Tester(Player):
     def __init__(self):
@@ -92,7 +110,7 @@ class Tester(Player):
         self.history = []
 
     def getSentence(self, sentence):
-        self.lastSentence = sentence
+        self.history.append(sentence)
         super().getSentence(sentence)
 
     def pickAction(self):
@@ -108,4 +126,9 @@ class Tester(Player):
 
     def newMatch(self):
         self.history = []
-    
\ No newline at end of file
+
+    def policy(self):
+        # states 0-3: number of rounds in a row that both kept quiet (up to 3); state 4: beginning
+        next = [[[min(s + 1, 3), 0], [0, 0]] for s in range(4)]
+        next.append([[1, 0], [0, 0]])
+        return Policy([1, 1, 1, 0, 0], next, start = 4)
@@ -0,0 +1,110 @@
+from prisoners.game import ACTIONS, NR_ROUNDS, calculateSentence
+import numpy as np
+
+
+"""
+A round robin where every player is given as a `Policy` instead of being asked for each action.
+All matches of a tournament are played at once, one array operation per round.
+Players with the same deterministic policy always play the same match against a given opponent policy,
+so such matches are only simulated once per pair of policies.
+Matches involving a stochastic policy (like `ForgivingTitForTat`) are simulated once per pair of players,
+so their cost grows with the square of the number of such players; they are still played side by side.
+"""
+
+
+def sentenceMatrix():
+    """ sentences[a][b]: the sentence for playing action `a` against action `b` """
+    return np.array([[calculateSentence(a, b)[0] for b in ACTIONS] for a in ACTIONS], dtype=float)
+
+
+def stackPolicies(policies):
+    """ all policies' tables in one; returns (cooperate, next, start state of every policy) """
+    offsets = np.cumsum([0] + [len(policy.cooperate) for policy in policies])
+    cooperate = np.concatenate([np.asarray(policy.cooperate, dtype=float) for policy in policies])
+    next = np.concatenate([np.asarray(policy.next, dtype=int) + offset for policy, offset in zip(policies, offsets)])
+    start = np.array([policy.start + offset for policy, offset in zip(policies, offsets)])
+    return cooperate, next, start
+
+
+def playMatches(cooperate, next, states1, states2, nrRounds, rng):
+    """ plays len(states1) matches side by side; returns the total sentences of both sides """
+    sentences = sentenceMatrix()
+    total1 = np.zeros(len(states1))
+    total2 = np.zeros(len(states2))
+    for _ in range(nrRounds):
+        actions1 = (rng.random(len(states1)) >= cooperate[states1]).astype(int)
+        actions2 = (rng.random(len(states2)) >= cooperate[states2]).astype(int)
+        total1 += sentences[actions1, actions2]
+        total2 += sentences[actions2, actions1]
+        states1 = next[states1, actions1, actions2]
+        states2 = next[states2, actions2, actions1]
+    return total1, total2
+
+
+def tournament(players, nrRounds = NR_ROUNDS, rng = None, verbose = False):
+    """
+        Every player plays `nrRounds` rounds against every other player.
+        Adds each player's sentences to its `allSentences` and returns them as an array, in the order of `players`.
+    """
+    if not players:
+        return np.zeros(0)
+    rng = rng or np.random.default_rng()
+    policies = []
+    groupOf = {}
+    group = np.empty(len(players), dtype=int)
+    for i, player in enumerate(players):
+        policy = player.policy()
+        key = (player.name, policy.key())
+        if key not in groupOf:
+            groupOf[key] = len(policies)
+            policies.append(policy)
+        group[i] = groupOf[key]
+    members = [np.flatnonzero(group == g) for g in range(len(policies))]
+    cooperate, next, start = stackPolicies(policies)
+
+    # one match per pair of groups where both are deterministic, one per pair of players otherwise
+    blocks = []   # (group of side 1 per match, group of side 2 per match, players of side 1, players of side 2, shared)
+    for g in range(len(policies)):
+        for h in range(g, len(policies)):
+            if g == h and len(members[g]) < 2:
+                continue
+            if policies[g].deterministic() and policies[h].deterministic():
+                blocks.append(([g], [h], members[g], members[h], True))
+            elif g == h:
+                i, j = np.triu_indices(len(members[g]), 1)
+                blocks.append((np.full(len(i), g), np.full(len(j), h), members[g][i], members[g][j], False))
+            else:
+                pairs1 = np.repeat(members[g], len(members[h]))
+                pairs2 = np.tile(members[h], len(members[g]))
+                blocks.append((np.full(len(pairs1), g), np.full(len(pairs2), h), pairs1, pairs2, False))
+
+    totals = np.zeros(len(players))
+    if blocks:
+        groups1 = np.concatenate([block[0] for block in blocks])
+        groups2 = np.concatenate([block[1] for block in blocks])
+        total1, total2 = playMatches(cooperate, next, start[groups1], start[groups2], nrRounds, rng)
+        offset = 0
+        for block1, block2, players1, players2, shared in blocks:
+            size = len(block1)
+            sentences1, sentences2 = total1[offset:offset+size], total2[offset:offset+size]
+            offset += size
+            if shared:
+                # the one match stands for every pair of players from the two groups
+                if block1[0] == block2[0]:
+                    # a deterministic policy against itself: both sides get the same sentence
+                    totals[players1] += sentences1[0] * (len(players1) - 1)
+                    nrMatches = len(players1) * (len(players1) - 1) // 2
+                else:
+                    totals[players1] += sentences1[0] * len(players2)
+                    totals[players2] += sentences2[0] * len(players1)
+                    nrMatches = len(players1) * len(players2)
+            else:
+                np.add.at(totals, players1, sentences1)
+                np.add.at(totals, players2, sentences2)
+                nrMatches = size
+            if verbose:
+                print(f"{players[players1[0]]} vs. {players[players2[0]]}: {np.mean(sentences1)} vs. {np.mean(sentences2)} years per match, {nrMatches} matches")
+
+    for player, total in zip(players, totals):
+        player.allSentences += total
+    return totals
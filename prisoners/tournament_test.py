@@ -0,0 +1,39 @@
+import io
+import contextlib
+import unittest as ut
+import numpy as np
+from prisoners.game import roundRobin
+from prisoners.players import Jesus, Satan, NiceTitForTat, MeanTitForTat, ForgivingTitForTat, Tester
+from prisoners.tournament import tournament
+
+
+def deterministicPlayers():
+    return [Jesus(), Jesus(), Satan(), NiceTitForTat(), NiceTitForTat(), MeanTitForTat(), Tester(), Satan()]
+
+
+class TournamentTests(ut.TestCase):
+
+    def testMatchesRoundRobin(self):
+        expected = deterministicPlayers()
+        with contextlib.redirect_stdout(io.StringIO()):
+            roundRobin(*expected)
+        players = deterministicPlayers()
+        totals = tournament(players)
+        self.assertTrue(np.allclose(totals, [player.allSentences for player in expected]))
+        self.assertTrue(np.allclose([player.allSentences for player in players], totals))
+
+    def testEmpty(self):
+        self.assertEqual(len(tournament([])), 0)
+
+    def testSingle(self):
+        self.assertTrue(np.allclose(tournament([Satan()]), [0]))
+
+    def testStochasticPlayersPlayEveryone(self):
+        players = [ForgivingTitForTat(0.5) for _ in range(3)] + [Satan()]
+        totals = tournament(players, rng=np.random.default_rng(0))
+        # every forgiving player cooperates in the first round against Satan, who rats out in every round
+        self.assertTrue(np.all(totals[:3] >= 10))
+        self.assertGreater(totals[3], 0)
+
+if __name__ == '__main__':
+    ut.main()